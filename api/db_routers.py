@@ -0,0 +1,77 @@
+"""
+Routage des requêtes de base de données vers un réplica en lecture.
+Actif uniquement lorsque REPLICA_DATABASE_URL est configuré (alias 'replica').
+
+Seuls les blocs explicitement marqués par use_replica() lisent depuis le réplica :
+les autres lectures, qui peuvent suivre une écriture, restent sur la base principale.
+"""
+
+import contextlib
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+
+# Indique si le bloc en cours accepte des lectures depuis le réplica
+_prefer_replica = ContextVar('prefer_replica', default=False)
+
+
+def replica_available():
+    """
+    Indique si un réplica en lecture est configuré.
+
+    Returns:
+        bool: True si l'alias 'replica' existe
+    """
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextlib.contextmanager
+def use_replica():
+    """
+    Gestionnaire de contexte dirigeant toutes les lectures du bloc vers le réplica.
+
+    Usage:
+        with use_replica():
+            stats = calculer_statistiques()
+    """
+    token = _prefer_replica.set(True)
+    try:
+        yield
+    finally:
+        _prefer_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Routeur envoyant les lectures éligibles vers le réplica et toutes les écritures
+    vers la base principale.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_available() or not _prefer_replica.get():
+            return None
+        
+        # Objet déjà chargé depuis la base principale : ses relations la suivent
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == DEFAULT_DB_ALIAS:
+            return None
+        
+        # Dans une transaction, les lectures doivent voir ses écritures et ses verrous
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Le réplica contient les mêmes données que la base principale
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Le réplica est alimenté par la réplication, jamais par les migrations
+        return db != REPLICA_ALIAS
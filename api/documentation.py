@@ -2,21 +2,11 @@
 Module de documentation pour le projet Plum API.
 Contient des informations sur l'architecture, les bonnes pratiques et les guides d'utilisation.
 """
+from types import MappingProxyType
 
-class ProjectDocumentation:
-    """
-    Documentation du projet Plum API.
-    """
-    
-    @staticmethod
-    def get_architecture_overview():
-        """
-        Aperçu de l'architecture du projet.
-        
-        Returns:
-            str: Description de l'architecture
-        """
-        return """
+
+# Sections de documentation, définies une seule fois au niveau du module
+ARCHITECTURE_OVERVIEW = """
 # Architecture du projet Plum API
 
 ## Vue d'ensemble
@@ -57,16 +47,8 @@ Le projet est organisé en plusieurs applications Django:
 - **Redis**: Pour le cache (optionnel)
 - **Celery**: Pour les tâches asynchrones (optionnel)
 """
-    
-    @staticmethod
-    def get_api_documentation():
-        """
-        Documentation de l'API.
-        
-        Returns:
-            str: Documentation de l'API
-        """
-        return """
+
+API_DOCUMENTATION = """
 # Documentation de l'API Plum
 
 ## Authentification
@@ -242,16 +224,8 @@ Réponse:
 }
 ```
 """
-    
-    @staticmethod
-    def get_best_practices():
-        """
-        Bonnes pratiques pour le développement.
-        
-        Returns:
-            str: Description des bonnes pratiques
-        """
-        return """
+
+BEST_PRACTICES = """
 # Bonnes pratiques pour le développement
 
 ## Sécurité
@@ -313,16 +287,8 @@ Réponse:
    - Extraire les fonctionnalités communes dans des utilitaires
    - Utiliser l'héritage et la composition pour réutiliser le code
 """
-    
-    @staticmethod
-    def get_deployment_guide():
-        """
-        Guide de déploiement.
-        
-        Returns:
-            str: Guide de déploiement
-        """
-        return """
+
+DEPLOYMENT_GUIDE = """
 # Guide de déploiement
 
 ## Prérequis
@@ -466,15 +432,7 @@ Réponse:
    - Suivre les bonnes pratiques pour les migrations de base de données
 """
 
-    @staticmethod
-    def get_user_guide():
-        """
-        Guide d'utilisation pour les utilisateurs finaux.
-        
-        Returns:
-            str: Guide d'utilisation
-        """
-        return """
+USER_GUIDE = """
 # Guide d'utilisation de Plum API
 
 ## Introduction
@@ -569,19 +527,78 @@ En tant qu'administrateur, vous pouvez:
    - Archivez les lots terminés pour garder votre interface organisée
 """
 
+
+class ProjectDocumentation:
+    """
+    Documentation du projet Plum API.
+    """
+    
+    @staticmethod
+    def get_architecture_overview():
+        """
+        Aperçu de l'architecture du projet.
+        
+        Returns:
+            str: Description de l'architecture
+        """
+        return ARCHITECTURE_OVERVIEW
+    
+    @staticmethod
+    def get_api_documentation():
+        """
+        Documentation de l'API.
+        
+        Returns:
+            str: Documentation de l'API
+        """
+        return API_DOCUMENTATION
+    
+    @staticmethod
+    def get_best_practices():
+        """
+        Bonnes pratiques pour le développement.
+        
+        Returns:
+            str: Description des bonnes pratiques
+        """
+        return BEST_PRACTICES
+    
+    @staticmethod
+    def get_deployment_guide():
+        """
+        Guide de déploiement.
+        
+        Returns:
+            str: Guide de déploiement
+        """
+        return DEPLOYMENT_GUIDE
+
+    @staticmethod
+    def get_user_guide():
+        """
+        Guide d'utilisation pour les utilisateurs finaux.
+        
+        Returns:
+            str: Guide d'utilisation
+        """
+        return USER_GUIDE
+
+
+# Le contenu est statique : on le calcule une seule fois à l'import.
+_DOCS = MappingProxyType({
+    "architecture": ARCHITECTURE_OVERVIEW,
+    "api": API_DOCUMENTATION,
+    "best_practices": BEST_PRACTICES,
+    "deployment": DEPLOYMENT_GUIDE,
+    "user_guide": USER_GUIDE
+})
+
+
 def generate_documentation():
     """
-    Génère la documentation complète du projet.
+    Retourne la documentation complète du projet.
     
     Returns:
-        dict: Documentation complète
+        Mapping: Documentation complète (lecture seule, calculée à l'import)
     """
-    docs = ProjectDocumentation()
-    
-    return {
-        "architecture": docs.get_architecture_overview(),
-        "api": docs.get_api_documentation(),
-        "best_practices": docs.get_best_practices(),
-        "deployment": docs.get_deployment_guide(),
-        "user_guide": docs.get_user_guide()
-    }
+    return _DOCS
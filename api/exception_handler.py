@@ -1,3 +1,6 @@
+import json
+
+from django.http import HttpResponse
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
@@ -6,6 +9,16 @@ from rest_framework import status
 # Cela résout l'erreur 'function' object has no attribute 'EXCEPTION_HANDLER'
 exception_handler.EXCEPTION_HANDLER = 'rest_framework.views.exception_handler'
 
+# Corps JSON pré-rendus pour les exceptions fréquentes au message stable
+# (indisponibilité d'un service tiers), afin d'éviter un rendu à chaque erreur.
+_PRECOMPUTED = {
+    exc_class: json.dumps({"detail": message}).encode('utf-8')
+    for exc_class, message in (
+        (ConnectionRefusedError, "Service temporairement indisponible."),
+        (TimeoutError, "Délai d'attente dépassé."),
+    )
+}
+
 def custom_exception_handler(exc, context):
     """
     Gestionnaire d'exceptions personnalisé qui étend le gestionnaire par défaut de DRF.
@@ -17,6 +30,15 @@ def custom_exception_handler(exc, context):
     if response is not None:
         return response
     
+    # Réponse pré-rendue pour les exceptions connues
+    blob = _PRECOMPUTED.get(type(exc))
+    if blob is not None:
+        return HttpResponse(
+            blob,
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content_type='application/json'
+        )
+    
     # Gestion des exceptions non gérées par le gestionnaire par défaut
     return Response(
         {"detail": str(exc)},
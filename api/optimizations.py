@@ -4,44 +4,83 @@ Fournit des fonctions et décorateurs pour améliorer les performances des requ
 """
 
 import time
+import contextlib
 import functools
+import hashlib
+import itertools
 import logging
-from django.db import connection, reset_queries
+from operator import itemgetter
+from django.db import connection
 from django.conf import settings
 from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
 from django.db.models import QuerySet, Prefetch
+from rest_framework import serializers
+
+from .db_routers import use_replica
 
 logger = logging.getLogger(__name__)
 
-def query_debugger(func):
+class QueryDebugger:
     """
-    Décorateur pour analyser les performances des requêtes de base de données.
+    Gestionnaire de contexte mesurant les requêtes exécutées dans un bloc.
     Affiche le nombre de requêtes et le temps d'exécution.
     
+    Ne fonctionne que si les requêtes sont journalisées (DEBUG=True).
+    """
+    
+    def __init__(self, label):
+        self.label = label
+    
+    def __enter__(self):
+        self.start_index = len(connection.queries_log)
+        self.start_time = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        total_time = time.perf_counter() - self.start_time
+        queries = list(itertools.islice(connection.queries_log, self.start_index, None))
+        query_time = sum(map(float, map(itemgetter('time'), queries)))
+        
+        logger.debug("Fonction: %s", self.label)
+        logger.debug("Nombre de requêtes: %d", len(queries))
+        logger.debug("Temps des requêtes: %.4fs", query_time)
+        logger.debug("Temps total: %.4fs", total_time)
+        return False
+
+
+def query_debugger(func_or_label):
+    """
+    Décorateur (ou gestionnaire de contexte) pour analyser les performances
+    des requêtes de base de données.
+    
+    Hors mode DEBUG, la fonction est retournée telle quelle et le gestionnaire
+    de contexte ne fait rien : aucun surcoût en production.
+    
     Usage:
         @query_debugger
         def ma_fonction(request):
             # Code utilisant des requêtes de base de données
+        
+        with query_debugger('chargement du dashboard'):
+            # Bloc à analyser
     """
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        reset_queries()
+    if callable(func_or_label):
+        func = func_or_label
+        if not settings.DEBUG:
+            return func
         
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
+        label = func.__qualname__
         
-        if settings.DEBUG:
-            query_count = len(connection.queries)
-            query_time = sum(float(q['time']) for q in connection.queries)
-            
-            logger.debug(f"Fonction: {func.__name__}")
-            logger.debug(f"Nombre de requêtes: {query_count}")
-            logger.debug(f"Temps des requêtes: {query_time:.4f}s")
-            logger.debug(f"Temps total: {end_time - start_time:.4f}s")
-            
-        return result
-    return wrapper
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with QueryDebugger(label):
+                return func(*args, **kwargs)
+        return wrapper
+    
+    if not settings.DEBUG:
+        return contextlib.nullcontext()
+    return QueryDebugger(func_or_label)
 
 
 def cached_queryset(timeout=3600, key_prefix=''):
@@ -60,63 +99,178 @@ def cached_queryset(timeout=3600, key_prefix=''):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            # Générer une clé de cache unique basée sur la fonction et ses arguments
-            cache_key = f"{key_prefix}_{func.__name__}"
-            for arg in args:
-                cache_key += f"_{arg}"
-            for key, value in kwargs.items():
-                cache_key += f"_{key}_{value}"
-            
-            # Vérifier si le résultat est déjà en cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Résultat récupéré du cache: {cache_key}")
-                return cached_result
-            
-            # Exécuter la fonction et mettre en cache le résultat
-            result = func(*args, **kwargs)
+            # Générer une clé de cache unique basée sur la fonction et ses arguments :
+            # empreinte BLAKE2b de la représentation canonique du tuple d'appel
+            payload = repr((func.__module__, func.__qualname__, args, sorted(kwargs.items())))
+            digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+            cache_key = f"{key_prefix}:{func.__name__}:{digest}"
             
-            # Si le résultat est un QuerySet, l'évaluer avant de le mettre en cache
-            if isinstance(result, QuerySet):
-                result = list(result)
+            def compute():
+                # Exécuter la fonction et mettre en cache le résultat ; les lectures
+                # sont servies par le réplica s'il est configuré
+                with use_replica():
+                    result = func(*args, **kwargs)
+                    
+                    # Si le résultat est un QuerySet, l'évaluer avant de le mettre en cache
+                    if isinstance(result, QuerySet):
+                        result = list(result)
                 
-            cache.set(cache_key, result, timeout)
-            logger.debug(f"Résultat mis en cache: {cache_key}")
+                logger.debug("Résultat mis en cache: %s", cache_key)
+                return result
             
-            return result
+            return cache.get_or_set(cache_key, compute, timeout)
         return wrapper
     return decorator
 
 
-def optimize_queryset(queryset, select_related=None, prefetch_related=None):
+def optimize_queryset(queryset, select_related=None, prefetch_related=None,
+                      only_fields=None, defer_fields=None, use_prefetch=True, using=None):
     """
-    Optimise un queryset en ajoutant select_related et prefetch_related.
+    Optimise un queryset en ajoutant select_related et prefetch_related,
+    et en limitant éventuellement les colonnes chargées.
     
     Args:
         queryset: Le queryset à optimiser
         select_related: Liste de champs pour select_related
         prefetch_related: Liste de champs ou objets Prefetch pour prefetch_related
+        only_fields: Liste de champs à charger exclusivement (accepte 'relation__champ')
+        defer_fields: Liste de champs dont le chargement est différé
+        use_prefetch: Si False, ignore prefetch_related (pour comparer les stratégies)
+        using: Alias de base de données optionnel (ex. 'replica')
         
     Returns:
         QuerySet: Le queryset optimisé
     """
+    if using:
+        queryset = queryset.using(using)
+    
     if select_related:
         queryset = queryset.select_related(*select_related)
         
-    if prefetch_related:
-        # Convertir les chaînes simples en objets Prefetch si nécessaire
-        prefetch_objects = []
-        for item in prefetch_related:
-            if isinstance(item, str):
-                prefetch_objects.append(item)
-            else:
-                prefetch_objects.append(item)  # Supposé être un objet Prefetch
-                
-        queryset = queryset.prefetch_related(*prefetch_objects)
+    if prefetch_related and use_prefetch:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    
+    if only_fields:
+        queryset = queryset.only(*only_fields)
+    
+    if defer_fields:
+        queryset = queryset.defer(*defer_fields)
         
     return queryset
 
 
+# Relations à charger, calculées une seule fois par classe de serializer
+_AUTO_OPTIMIZE_CACHE = {}
+
+
+def _collect_relations(serializer_class, model, prefix=''):
+    """
+    Parcourt les champs d'un serializer pour déterminer les relations à précharger.
+    
+    Args:
+        serializer_class: La classe de serializer à analyser
+        model: Le modèle correspondant au serializer
+        prefix: Préfixe de chemin pour les serializers imbriqués
+        
+    Returns:
+        tuple: (chemins pour select_related, chemins pour prefetch_related)
+    """
+    selects, prefetches = [], []
+    
+    for field in serializer_class().fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        
+        # Un PrimaryKeyRelatedField simple lit directement la clé étrangère
+        if isinstance(field, serializers.RelatedField) and field.use_pk_only_optimization():
+            continue
+        
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(field, serializers.ManyRelatedField):
+            nested = field.child_relation
+        
+        # Suivre la source (ex. 'owner.username') tant qu'elle traverse des relations
+        current_model, path, to_many = model, prefix, False
+        for attr in field.source_attrs:
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation or model_field.related_model is None:
+                break
+            path = f"{path}{attr}"
+            to_many = to_many or model_field.one_to_many or model_field.many_to_many
+            (prefetches if to_many else selects).append(path)
+            current_model = model_field.related_model
+            path = f"{path}__"
+        else:
+            # La source se termine sur une relation : descendre dans le serializer imbriqué
+            if path != prefix and isinstance(nested, serializers.ModelSerializer):
+                nested_selects, nested_prefetches = _collect_relations(
+                    type(nested), current_model, path
+                )
+                (prefetches if to_many else selects).extend(nested_selects)
+                prefetches.extend(nested_prefetches)
+    
+    return selects, prefetches
+
+
+def auto_optimize(queryset, serializer_class):
+    """
+    Applique automatiquement select_related et prefetch_related selon les champs
+    déclarés par un serializer.
+    
+    Les relations vers un objet unique (ForeignKey, OneToOne) passent par
+    select_related, les relations multiples par prefetch_related. L'analyse est
+    mise en cache par classe de serializer.
+    
+    Args:
+        queryset: Le queryset à optimiser
+        serializer_class: Le serializer utilisé pour rendre le queryset
+        
+    Returns:
+        QuerySet: Le queryset optimisé
+    """
+    relations = _AUTO_OPTIMIZE_CACHE.get(serializer_class)
+    if relations is None:
+        selects, prefetches = _collect_relations(serializer_class, queryset.model)
+        # Ne garder que les chemins les plus longs : select_related('a__b') inclut 'a'
+        selects = [
+            path for path in dict.fromkeys(selects)
+            if not any(other.startswith(f"{path}__") for other in selects)
+        ]
+        relations = _AUTO_OPTIMIZE_CACHE[serializer_class] = (
+            tuple(selects), tuple(dict.fromkeys(prefetches))
+        )
+    
+    return optimize_queryset(queryset, select_related=relations[0], prefetch_related=relations[1])
+
+
+class AutoPrefetchMixin:
+    """
+    Mixin pour les vues génériques DRF appliquant le préchargement des relations
+    dérivé du serializer de la vue.
+    
+    Si le serializer définit une méthode de classe setup_eager_loading, elle est
+    utilisée telle quelle ; sinon les relations sont déduites par auto_optimize.
+    Les vues qui surchargent get_queryset doivent partir de super().get_queryset().
+    
+    Usage:
+        class FarmList(AutoPrefetchMixin, ListCreateAPIView):
+            queryset = Farm.objects.all()
+            serializer_class = FarmSerializer
+    """
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        
+        setup_eager_loading = getattr(serializer_class, 'setup_eager_loading', None)
+        if setup_eager_loading is not None:
+            return setup_eager_loading(queryset)
+        return auto_optimize(queryset, serializer_class)
+
+
 def batch_process(queryset, batch_size=1000, callback=None):
     """
     Traite un grand queryset par lots pour éviter les problèmes de mémoire.
@@ -131,23 +285,21 @@ def batch_process(queryset, batch_size=1000, callback=None):
     """
     total_processed = 0
     
-    # Récupérer l'ID du premier objet
-    first_obj = queryset.order_by('id').first()
-    if not first_obj:
-        return 0
-    
-    current_id = first_obj.id - 1
+    # Pagination par clé (keyset) sur la clé primaire : chaque lot est une
+    # simple plage d'index, sans requête préalable pour trouver le premier objet
+    queryset = queryset.order_by('pk')
+    last_pk = None
     
     while True:
         # Récupérer le prochain lot
-        batch = queryset.filter(id__gt=current_id).order_by('id')[:batch_size]
-        batch_list = list(batch)
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch_list = list(page[:batch_size])
         
         if not batch_list:
             break
             
-        # Mettre à jour l'ID pour le prochain lot
-        current_id = batch_list[-1].id
+        # Mettre à jour la clé pour le prochain lot
+        last_pk = batch_list[-1].pk
         
         # Traiter le lot
         if callback:
@@ -155,10 +307,14 @@ def batch_process(queryset, batch_size=1000, callback=None):
             
         total_processed += len(batch_list)
         
+        # Lot incomplet : il n'y a plus rien à lire
+        if len(batch_list) < batch_size:
+            break
+        
     return total_processed
 
 
-def get_optimized_classifications(farm_id=None, user_id=None, limit=None):
+def get_optimized_classifications(farm_id=None, user_id=None, limit=None, only_fields=None):
     """
     Exemple de fonction optimisée pour récupérer des classifications.
     
@@ -166,6 +322,7 @@ def get_optimized_classifications(farm_id=None, user_id=None, limit=None):
         farm_id: ID de la ferme optionnel
         user_id: ID de l'utilisateur optionnel
         limit: Limite optionnelle du nombre de résultats
+        only_fields: Colonnes à charger exclusivement (ex. pour une liste)
         
     Returns:
         QuerySet: QuerySet optimisé de PlumClassification
@@ -184,7 +341,7 @@ def get_optimized_classifications(farm_id=None, user_id=None, limit=None):
     queryset = optimize_queryset(
         queryset,
         select_related=['uploaded_by', 'farm', 'batch'],
-        prefetch_related=[]
+        only_fields=only_fields
     )
     
     # Appliquer la limite si spécifiée
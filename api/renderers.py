@@ -0,0 +1,85 @@
+"""
+Renderers personnalisés pour l'API.
+Fournit un rendu JSON basé sur orjson, plus rapide que le module json standard.
+"""
+
+import math
+
+import numpy as np
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Encodeur DRF utilisé pour les types non pris en charge nativement par orjson
+# (chaînes paresseuses, Decimal, timedelta, QuerySet, ...)
+_FALLBACK_ENCODER = JSONEncoder()
+
+# Les dates restent formatées par DRF (suffixe 'Z' pour UTC)
+# pour conserver une sortie identique au JSONRenderer standard
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_SERIALIZE_NUMPY
+    | orjson.OPT_PASSTHROUGH_DATETIME
+)
+
+
+def _check_finite(data):
+    """
+    Vérifie récursivement l'absence de flottants non finis (NaN, Infinity).
+
+    orjson les écrit sous la forme null ; le JSONRenderer de DRF les refuse
+    lorsque STRICT_JSON est activé.
+
+    Raises:
+        ValueError: Si une valeur flottante non finie est rencontrée
+    """
+    if isinstance(data, float):
+        if not math.isfinite(data):
+            raise ValueError(f"Out of range float values are not JSON compliant: {data!r}")
+    elif isinstance(data, dict):
+        for value in data.values():
+            _check_finite(value)
+    elif isinstance(data, (list, tuple)):
+        for value in data:
+            _check_finite(value)
+    elif isinstance(data, (np.ndarray, np.floating)):
+        if np.issubdtype(np.asarray(data).dtype, np.floating) and not np.isfinite(data).all():
+            raise ValueError("Out of range float values are not JSON compliant")
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renderer JSON utilisant orjson.
+
+    Produit le même format que le JSONRenderer de DRF (UTF-8, sans échappement ASCII)
+    et délègue les types inconnus à l'encodeur de DRF. Comme lui, refuse les
+    flottants non finis lorsque STRICT_JSON est activé.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Sérialise les données en JSON.
+
+        Args:
+            data: Les données à sérialiser
+            accepted_media_type: Le type de média accepté (peut contenir un paramètre indent)
+            renderer_context: Le contexte de rendu
+
+        Returns:
+            bytes: Le contenu JSON encodé
+
+        Raises:
+            ValueError: Si STRICT_JSON est activé et que les données contiennent NaN ou Infinity
+        """
+        if data is None:
+            return b''
+
+        if self.strict:
+            _check_finite(data)
+
+        options = _ORJSON_OPTIONS
+        # orjson ne gère qu'une indentation de deux espaces
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=_FALLBACK_ENCODER.default, option=options)
@@ -4,8 +4,12 @@ Fournit des fonctions pour valider et sécuriser les données entrantes.
 """
 
 import os
+import re
+import uuid
 import magic
+import nh3
 import logging
+import numpy as np
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
@@ -13,6 +17,47 @@ from django.utils.translation import gettext_lazy as _
 
 logger = logging.getLogger(__name__)
 
+# Expressions régulières de validation, compilées une seule fois
+_FILENAME_UNSAFE_RE = re.compile(r'[^\w\-]', re.ASCII)
+_PHONE_STRIP_RE = re.compile(r'[\s\-\(\)]')
+_PHONE_RE = re.compile(r'^\+?\d{8,15}$')
+
+# Balises et attributs HTML autorisés lors du nettoyage
+_ALLOWED_HTML_TAGS = {
+    'a', 'abbr', 'acronym', 'b', 'blockquote', 'code', 'em', 'i',
+    'li', 'ol', 'p', 'strong', 'ul', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'
+}
+_ALLOWED_HTML_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'abbr': {'title'},
+    'acronym': {'title'},
+}
+
+# Instance libmagic partagée, utilisée uniquement en repli
+_MAGIC = magic.Magic(mime=True)
+
+
+def _sniff_image_mimetype(head):
+    """
+    Détermine le type MIME d'une image à partir de ses premiers octets.
+    
+    Args:
+        head: Les premiers octets du fichier (au moins 12)
+        
+    Returns:
+        str: Le type MIME reconnu, ou None si la signature est inconnue
+    """
+    if head[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
 class FileSecurity:
     """
     Classe pour la validation et la sécurisation des fichiers uploadés.
@@ -55,9 +100,13 @@ class FileSecurity:
             raise ValidationError(_("Le fichier est vide."))
             
         # Lire les premiers octets du fichier pour déterminer son type
-        file_mime = magic.from_buffer(file.read(1024), mime=True)
+        head = file.read(1024)
         file.seek(0)  # Réinitialiser le pointeur de fichier
         
+        # Les signatures d'images courantes suffisent dans la plupart des cas ;
+        # libmagic n'est sollicitée que pour les formats non reconnus
+        file_mime = _sniff_image_mimetype(head) or _MAGIC.from_buffer(head)
+        
         if file_mime not in allowed_mimetypes:
             raise ValidationError(
                 _("Type de fichier non autorisé. Types autorisés: %(types)s"),
@@ -154,9 +203,8 @@ class FileSecurity:
         # Extraire l'extension
         base, ext = os.path.splitext(filename)
         
-        # Supprimer les caractères spéciaux et les espaces
-        import re
-        base = re.sub(r'[^\w\-]', '_', base)
+        # Ne conserver que les caractères ASCII sûrs (lettres, chiffres, _ et -)
+        base = _FILENAME_UNSAFE_RE.sub('_', base)
         
         # Limiter la longueur du nom de base
         if len(base) > 100:
@@ -178,8 +226,6 @@ class FileSecurity:
         Returns:
             str: Le chemin d'upload sécurisé
         """
-        import uuid
-        
         # Nettoyer le nom de fichier
         original_name = FileSecurity.sanitize_filename(file.name)
         
@@ -230,6 +276,41 @@ class InputValidation:
         except (ValueError, TypeError):
             raise ValidationError(_("Les coordonnées doivent être des nombres."))
     
+    @staticmethod
+    def validate_coordinates_bulk(latitudes, longitudes):
+        """
+        Valide un ensemble de coordonnées géographiques en une seule passe vectorisée.
+        
+        Args:
+            latitudes: Séquence de latitudes
+            longitudes: Séquence de longitudes (même longueur)
+            
+        Returns:
+            bool: True si toutes les coordonnées sont valides
+            
+        Raises:
+            ValidationError: Si au moins une paire n'est pas valide (indices fournis)
+        """
+        try:
+            lat = np.asarray(latitudes, dtype=np.float64)
+            lng = np.asarray(longitudes, dtype=np.float64)
+        except (ValueError, TypeError):
+            raise ValidationError(_("Les coordonnées doivent être des nombres."))
+        
+        if lat.shape != lng.shape:
+            raise ValidationError(_("Les listes de latitudes et de longitudes doivent avoir la même taille."))
+        
+        # Les comparaisons avec NaN sont fausses : les valeurs manquantes sont rejetées
+        valid = (lat >= -90) & (lat <= 90) & (lng >= -180) & (lng <= 180)
+        if not valid.all():
+            invalid = np.flatnonzero(~valid).tolist()
+            raise ValidationError(
+                _("Coordonnées invalides aux positions: %(indices)s"),
+                params={'indices': ', '.join(map(str, invalid))}
+            )
+        
+        return True
+    
     @staticmethod
     def sanitize_html(html_content):
         """
@@ -241,26 +322,12 @@ class InputValidation:
         Returns:
             str: Le contenu HTML nettoyé
         """
-        import bleach
-        
-        # Définir les balises et attributs autorisés
-        allowed_tags = [
-            'a', 'abbr', 'acronym', 'b', 'blockquote', 'code', 'em', 'i',
-            'li', 'ol', 'p', 'strong', 'ul', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'
-        ]
-        
-        allowed_attrs = {
-            'a': ['href', 'title'],
-            'abbr': ['title'],
-            'acronym': ['title'],
-        }
-        
-        # Nettoyer le HTML
-        return bleach.clean(
+        # Les balises non autorisées sont retirées, leur texte est conservé
+        return nh3.clean(
             html_content,
-            tags=allowed_tags,
-            attributes=allowed_attrs,
-            strip=True
+            tags=_ALLOWED_HTML_TAGS,
+            attributes=_ALLOWED_HTML_ATTRIBUTES,
+            link_rel=None
         )
     
     @staticmethod
@@ -277,13 +344,11 @@ class InputValidation:
         Raises:
             ValidationError: Si le numéro n'est pas valide
         """
-        import re
-        
         # Supprimer les espaces, tirets, parenthèses
-        phone = re.sub(r'[\s\-\(\)]', '', phone)
+        phone = _PHONE_STRIP_RE.sub('', phone)
         
         # Vérifier que le numéro contient uniquement des chiffres et éventuellement un + au début
-        if not re.match(r'^\+?\d{8,15}$', phone):
+        if not _PHONE_RE.match(phone):
             raise ValidationError(_("Le numéro de téléphone n'est pas valide."))
             
         return True
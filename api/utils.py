@@ -7,6 +7,7 @@ import logging
 import functools
 import inspect
 from typing import Any, Callable, Dict, List, Optional, Type, Union
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import status
 from rest_framework.response import Response
@@ -14,6 +15,11 @@ from rest_framework.views import exception_handler
 
 logger = logging.getLogger(__name__)
 
+# Messages d'erreur génériques, construits une seule fois
+_VALIDATION_ERROR_MESSAGE = _("Des erreurs de validation se sont produites.")
+_GENERIC_ERROR_MESSAGE = _("Une erreur s'est produite.")
+_REQUIRED_FIELD_MESSAGE = _("Ce champ est obligatoire.")
+
 class ResponseBuilder:
     """
     Classe utilitaire pour construire des réponses API cohérentes.
@@ -82,41 +88,37 @@ def custom_exception_handler(exc, context):
     
     # Si le gestionnaire par défaut a retourné une réponse
     if response is not None:
-        # Récupérer les détails de l'exception
-        error_data = {}
-        
-        if hasattr(exc, 'detail'):
-            if isinstance(exc.detail, dict):
-                for key, value in exc.detail.items():
-                    if isinstance(value, list):
-                        error_data[key] = value[0]
-                    else:
-                        error_data[key] = value
-            elif isinstance(exc.detail, list):
-                error_message = exc.detail[0] if exc.detail else _("Une erreur s'est produite.")
-                return ResponseBuilder.error(
-                    message=str(error_message),
-                    status_code=response.status_code
-                )
-            else:
-                error_message = exc.detail
+        detail = getattr(exc, 'detail', None)
+        
+        # Cas le plus fréquent : erreurs de validation par champ
+        if isinstance(detail, dict):
+            # Ne conserver que le premier message de chaque champ
+            error_data = {
+                key: value[0] if isinstance(value, list) and value else value
+                for key, value in detail.items()
+            }
+            if error_data:
                 return ResponseBuilder.error(
-                    message=str(error_message),
+                    message=_VALIDATION_ERROR_MESSAGE,
+                    errors=error_data,
                     status_code=response.status_code
                 )
-        
-        # Construire une réponse d'erreur formatée
-        if error_data:
+        elif isinstance(detail, list):
+            error_message = detail[0] if detail else _GENERIC_ERROR_MESSAGE
             return ResponseBuilder.error(
-                message=_("Des erreurs de validation se sont produites."),
-                errors=error_data,
+                message=str(error_message),
                 status_code=response.status_code
             )
-        else:
+        elif detail is not None:
             return ResponseBuilder.error(
-                message=_("Une erreur s'est produite."),
+                message=str(detail),
                 status_code=response.status_code
             )
+        
+        return ResponseBuilder.error(
+            message=_GENERIC_ERROR_MESSAGE,
+            status_code=response.status_code
+        )
     
     # Si le gestionnaire par défaut n'a pas retourné de réponse, logger l'exception
     logger.exception("Exception non gérée: %s", exc)
@@ -139,23 +141,27 @@ def log_method_calls(level=logging.DEBUG):
         Callable: Décorateur
     """
     def decorator(func):
+        # Déterminer une seule fois le nom affiché : "Classe.méthode" pour une méthode
+        parameters = list(inspect.signature(func).parameters)
+        if parameters and parameters[0] in ('self', 'cls'):
+            method_name = func.__qualname__.rsplit('.<locals>.', 1)[-1]
+        else:
+            method_name = func.__name__
+        
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            # Récupérer le nom de la classe si c'est une méthode
-            if args and hasattr(args[0], '__class__'):
-                class_name = args[0].__class__.__name__
-                method_name = f"{class_name}.{func.__name__}"
-            else:
-                method_name = func.__name__
+            # Aucun coût de formatage lorsque le niveau de log est désactivé
+            if not logger.isEnabledFor(level):
+                return func(*args, **kwargs)
             
             # Logger l'appel de méthode
-            logger.log(level, f"Appel de {method_name}")
+            logger.log(level, "Appel de %s", method_name)
             
             # Exécuter la fonction
             result = func(*args, **kwargs)
             
             # Logger la fin de l'exécution
-            logger.log(level, f"Fin de {method_name}")
+            logger.log(level, "Fin de %s", method_name)
             
             return result
         return wrapper
@@ -176,7 +182,6 @@ class AuditMixin:
         
         # Ajouter des informations d'audit si les champs existent
         if hasattr(self, 'updated_at'):
-            from django.utils import timezone
             self.updated_at = timezone.now()
         
         # Appeler la méthode save parent
@@ -241,10 +246,11 @@ def validate_required_fields(data, required_fields):
     Returns:
         tuple: (is_valid, errors)
     """
-    errors = {}
-    
-    for field in required_fields:
-        if field not in data or data[field] is None or data[field] == '':
-            errors[field] = _("Ce champ est obligatoire.")
+    # Un champ absent est lu comme None par data.get()
+    errors = {
+        field: _REQUIRED_FIELD_MESSAGE
+        for field in required_fields
+        if (value := data.get(field)) is None or value == ''
+    }
     
-    return len(errors) == 0, errors
+    return not errors, errors
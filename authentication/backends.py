@@ -0,0 +1,84 @@
+import copy
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+# Short-lived in-process cache of authenticated access tokens:
+# BLAKE2b digest of the raw token -> (expires_at, validated_token, user)
+_TOKEN_CACHE = {}
+_TOKEN_CACHE_LOCK = threading.Lock()
+
+TOKEN_CACHE_TTL = getattr(settings, 'JWT_AUTH_CACHE_TTL', 5)
+TOKEN_CACHE_MAXSIZE = getattr(settings, 'JWT_AUTH_CACHE_MAXSIZE', 10_000)
+
+
+def clear_token_cache():
+    """
+    Drop every cached token (e.g. after deactivating a user).
+    """
+    with _TOKEN_CACHE_LOCK:
+        _TOKEN_CACHE.clear()
+
+
+def evict_user_tokens(user_id):
+    """
+    Drop the cached tokens of one user (e.g. after a password or status change).
+
+    Only this process's cache is affected; other workers drop their entries
+    when they expire, after at most TOKEN_CACHE_TTL seconds.
+    """
+    with _TOKEN_CACHE_LOCK:
+        for key in [k for k, v in _TOKEN_CACHE.items() if v[2].pk == user_id]:
+            del _TOKEN_CACHE[key]
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that remembers verified access tokens for a few seconds.
+
+    A client sending the same token repeatedly skips the signature check and
+    the user lookup until the entry expires (never past the token's own 'exp').
+    Tokens are keyed by a BLAKE2b digest so raw JWTs are never kept in memory.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        key = hashlib.blake2b(raw_token, digest_size=16).digest()
+        entry = _TOKEN_CACHE.get(key)
+        if entry is not None and entry[0] > time.time():
+            # Each request gets its own instance so per-request changes don't leak
+            return copy.copy(entry[2]), entry[1]
+
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_user(validated_token)
+        self._remember(key, validated_token, user)
+
+        return user, validated_token
+
+    def _remember(self, key, validated_token, user):
+        """
+        Cache a verified token without outliving its expiration claim.
+        """
+        now = time.time()
+        expires_at = min(now + TOKEN_CACHE_TTL, validated_token.get('exp', now))
+        if expires_at <= now:
+            return
+
+        with _TOKEN_CACHE_LOCK:
+            if len(_TOKEN_CACHE) >= TOKEN_CACHE_MAXSIZE:
+                # Purge expired entries first, then the oldest ones
+                for stale_key in [k for k, v in _TOKEN_CACHE.items() if v[0] <= now]:
+                    del _TOKEN_CACHE[stale_key]
+                while len(_TOKEN_CACHE) >= TOKEN_CACHE_MAXSIZE:
+                    del _TOKEN_CACHE[next(iter(_TOKEN_CACHE))]
+            _TOKEN_CACHE[key] = (expires_at, validated_token, copy.copy(user))
@@ -1,10 +1,15 @@
+import operator
+
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from users.models import hash_token
+from .tokens import CachedBlacklistRefreshToken
+
 User = get_user_model()
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -39,7 +44,7 @@ class RegisterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"password": list(e.messages)})
         
         # Check if email already exists
-        if User.objects.filter(email=data.get('email')).exists():
+        if User.objects.filter(email__iexact=data.get('email')).exists():
             raise serializers.ValidationError({"email": "A user with this email already exists."})
         
         return data
@@ -65,14 +70,8 @@ class RegisterSerializer(serializers.ModelSerializer):
             is_active=False  # User will be activated after email verification
         )
         
-        # Generate email verification token
-        user.generate_email_verification_token()
-        user.email_verification_sent_at = timezone.now()
-        user.save()
-        
-        # Create default user settings
-        from users.models import UserSettings
-        UserSettings.objects.get_or_create(user=user)
+        # The email verification token and the default user settings are
+        # created by the users post_save signals
         
         return user
 
@@ -87,7 +86,8 @@ class EmailVerificationSerializer(serializers.Serializer):
         """
         Validate that the token exists and is associated with a user.
         """
-        user = User.objects.filter(email_verification_token=value).first()
+        # Only the token hash is stored
+        user = User.objects.filter(email_verification_token=hash_token(value)).first()
         if not user:
             raise serializers.ValidationError("Invalid verification token.")
         
@@ -97,6 +97,8 @@ class EmailVerificationSerializer(serializers.Serializer):
             if timezone.now() > expiration_time:
                 raise serializers.ValidationError("Verification token has expired. Please request a new one.")
         
+        # Keep the resolved user so the view doesn't query it again
+        self.user = user
         return value
 
 
@@ -110,16 +112,30 @@ class ResendVerificationEmailSerializer(serializers.Serializer):
         """
         Validate that the email exists in the system.
         """
-        user = User.objects.filter(email=value).first()
+        user = User.objects.filter(email__iexact=value).first()
         if not user:
             raise serializers.ValidationError("No user found with this email address.")
         
         if user.email_verified:
             raise serializers.ValidationError("This email is already verified.")
         
+        # Keep the resolved user so the view doesn't query it again
+        self.user = user
         return value
 
 
+# User attributes added to the JWT claims and to the login response
+_CLAIM_KEYS = ('username', 'email', 'role', 'first_name', 'last_name', 'email_verified')
+_CLAIM_GETTER = operator.attrgetter(*_CLAIM_KEYS)
+
+
+def _user_claims(user):
+    """
+    Return the custom claims of a user as a dict.
+    """
+    return dict(zip(_CLAIM_KEYS, _CLAIM_GETTER(user)))
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Custom token serializer to include additional user information in the token response.
@@ -129,12 +145,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         
         # Add custom claims
-        token['username'] = user.username
-        token['email'] = user.email
-        token['role'] = user.role
-        token['first_name'] = user.first_name
-        token['last_name'] = user.last_name
-        token['email_verified'] = user.email_verified
+        token.payload.update(_user_claims(user))
         
         return token
     
@@ -149,16 +160,18 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         
         # Add extra responses
         data['user_id'] = self.user.id
-        data['username'] = self.user.username
-        data['email'] = self.user.email
-        data['role'] = self.user.role
-        data['first_name'] = self.user.first_name
-        data['last_name'] = self.user.last_name
-        data['email_verified'] = self.user.email_verified
+        data.update(_user_claims(self.user))
         
         return data
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh serializer that also rejects tokens revoked through the cache.
+    """
+    token_class = CachedBlacklistRefreshToken
+
+
 class ChangePasswordSerializer(serializers.Serializer):
     """
     Serializer for password change.
@@ -187,16 +200,11 @@ class ChangePasswordSerializer(serializers.Serializer):
 class PasswordResetRequestSerializer(serializers.Serializer):
     """
     Serializer for password reset request.
+    
+    The email is not checked against existing users: the view answers the same
+    way whether or not an account exists, to prevent email enumeration.
     """
     email = serializers.EmailField(required=True)
-    
-    def validate_email(self, value):
-        """
-        Validate that the email exists in the system.
-        """
-        if not User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("No user found with this email address.")
-        return value
 
 
 class PasswordResetConfirmSerializer(serializers.Serializer):
@@ -0,0 +1,174 @@
+import functools
+from smtplib import SMTPException
+
+from celery import shared_task
+from celery.signals import worker_process_init, worker_process_shutdown
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.db import DatabaseError
+from django.template.loader import get_template
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from users.models import hash_token
+from .tokens import encode_uid
+
+User = get_user_model()
+
+SITE_NAME = 'Plum Classification System'
+
+# Email verification links expire after this many hours
+VERIFICATION_TOKEN_MAX_AGE_HOURS = 48
+
+# Password reset links expire after this many hours
+PASSWORD_RESET_TOKEN_MAX_AGE_HOURS = 24
+
+
+# SMTP connection kept open for the lifetime of a Celery worker process, so
+# consecutive emails share one TCP/TLS session. Outside a worker (eager mode)
+# each email opens its own connection, as send_mail does.
+_mail_connection = None
+
+
+@worker_process_init.connect
+def _open_mail_connection(**kwargs):
+    global _mail_connection
+    _mail_connection = mail.get_connection()
+
+
+@worker_process_shutdown.connect
+def _close_mail_connection(**kwargs):
+    if _mail_connection is not None:
+        _mail_connection.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_template(template_name):
+    """
+    Resolve an email template once per process; later sends only render it.
+    """
+    return get_template(template_name)
+
+
+def _send_templated_email(user, subject, template_name, context):
+    """
+    Render the HTML and plain-text variants of an email template and send them.
+
+    ``template_name`` has no extension: ``<name>.html`` and ``<name>.txt``
+    are rendered with the same context.
+    """
+    context = {'user': user, 'site_name': SITE_NAME, **context}
+    html_message = _get_template(f'{template_name}.html').render(context)
+    plain_message = _get_template(f'{template_name}.txt').render(context)
+
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=plain_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+        connection=_mail_connection
+    )
+    message.attach_alternative(html_message, 'text/html')
+
+    if _mail_connection is None:
+        message.send(fail_silently=False)
+        return
+
+    try:
+        # No-op when the connection is already open
+        _mail_connection.open()
+        message.send(fail_silently=False)
+    except SMTPException:
+        # Drop the (possibly stale) connection; the retry reconnects
+        _mail_connection.close()
+        raise
+
+
+@shared_task(autoretry_for=(SMTPException,), retry_backoff=True, max_retries=5)
+def send_verification_email_task(user_id, token):
+    """
+    Send the email verification link to a user.
+
+    The plain token only travels with the task: the database keeps its hash.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    # Skip tokens that were consumed or replaced by a newer one meanwhile
+    if user is None or user.email_verification_token != hash_token(token):
+        return
+
+    _send_templated_email(
+        user,
+        subject='Verify your email address',
+        template_name='authentication/email_verification',
+        context={
+            'verification_url': f"{settings.FRONTEND_URL}/verify-email/{token}",
+            'expiration_hours': VERIFICATION_TOKEN_MAX_AGE_HOURS
+        }
+    )
+
+
+@shared_task(autoretry_for=(SMTPException,), retry_backoff=True, max_retries=5)
+def send_password_reset_email_task(user_id, token):
+    """
+    Send a password reset link to a user.
+
+    The plain token only travels with the task: the database keeps its hash.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    # Skip tokens that were consumed or replaced by a newer one meanwhile
+    if user is None or user.password_reset_token != hash_token(token):
+        return
+
+    uid = encode_uid(user.pk)
+
+    _send_templated_email(
+        user,
+        subject='Reset your password',
+        template_name='authentication/password_reset_email',
+        context={
+            'reset_url': f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}",
+            'expiration_hours': PASSWORD_RESET_TOKEN_MAX_AGE_HOURS
+        }
+    )
+
+
+@shared_task
+def purge_expired_tokens():
+    """
+    Clear expired email verification and password reset tokens so the token
+    indexes stay small.
+
+    Returns:
+        int: Number of tokens cleared
+    """
+    now = timezone.now()
+    verification_cutoff = now - timezone.timedelta(hours=VERIFICATION_TOKEN_MAX_AGE_HOURS)
+    reset_cutoff = now - timezone.timedelta(hours=PASSWORD_RESET_TOKEN_MAX_AGE_HOURS)
+
+    cleared = User.objects.filter(
+        email_verification_token__isnull=False,
+        email_verification_sent_at__lt=verification_cutoff
+    ).update(email_verification_token=None, email_verification_sent_at=None)
+    cleared += User.objects.filter(
+        password_reset_token__isnull=False,
+        password_reset_sent_at__lt=reset_cutoff
+    ).update(password_reset_token=None, password_reset_sent_at=None)
+    return cleared
+
+
+@shared_task(autoretry_for=(DatabaseError,), retry_backoff=True, max_retries=5)
+def blacklist_refresh_token_task(jti, exp):
+    """
+    Persist the blacklisting of a refresh token already verified by the caller.
+
+    Only the token identifier and expiry travel through the broker, never the
+    token itself. The outstanding row normally exists since the token was issued.
+    """
+    token, _ = OutstandingToken.objects.get_or_create(
+        jti=jti,
+        defaults={'token': '', 'expires_at': datetime_from_epoch(exp)}
+    )
+    BlacklistedToken.objects.get_or_create(token=token)
@@ -0,0 +1,40 @@
+from collections.abc import Mapping
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class EmailAddressRateThrottle(SimpleRateThrottle):
+    """
+    Limits how many emails can be requested for a given address.
+
+    Applied whether or not the address belongs to an account, so a 429
+    reveals nothing about existing users.
+    """
+    scope = 'email_send'
+
+    def get_cache_key(self, request, view):
+        # Throttles run before validation: the body may be a list or a scalar
+        if not isinstance(request.data, Mapping):
+            return None
+
+        email = request.data.get('email')
+        if not isinstance(email, str) or not email.strip():
+            return None
+
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': email.strip().lower()
+        }
+
+
+class EmailSendIPRateThrottle(SimpleRateThrottle):
+    """
+    Limits how many email-sending requests a single client IP can make.
+    """
+    scope = 'email_send_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
@@ -0,0 +1,76 @@
+import base64
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+BLACKLIST_CACHE_PREFIX = 'jwt:blacklist'
+
+# Cache backends local to one process: a marker set there is invisible to other workers
+_PROCESS_LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_is_shared():
+    """
+    Whether the default cache is shared by every web process (e.g. Redis).
+
+    Cache-based revocation markers are only reliable with a shared cache.
+    """
+    return settings.CACHES['default']['BACKEND'] not in _PROCESS_LOCAL_CACHE_BACKENDS
+
+
+def blacklist_cache_key(jti):
+    """
+    Cache key marking a refresh token as blacklisted.
+    """
+    return f"{BLACKLIST_CACHE_PREFIX}:{jti}"
+
+
+def mark_blacklisted(token):
+    """
+    Mark a refresh token as blacklisted in the cache until it expires.
+
+    The marker makes the revocation visible immediately, while the durable
+    blacklist row is written asynchronously. It requires a shared cache
+    (see cache_is_shared): a process-local marker only protects one worker.
+    """
+    timeout = max(int(token['exp'] - time.time()), 1)
+    cache.set(blacklist_cache_key(token[api_settings.JTI_CLAIM]), True, timeout)
+
+
+def encode_uid(pk):
+    """
+    Encode a user primary key as a short URL-safe string (8-byte big-endian).
+    """
+    return base64.urlsafe_b64encode(pk.to_bytes(8, 'big')).rstrip(b'=').decode('ascii')
+
+
+def decode_uid(uid):
+    """
+    Decode a string produced by encode_uid.
+
+    Raises:
+        ValueError: If the string is not a valid encoded primary key
+    """
+    raw = uid.encode('ascii')
+    decoded = base64.urlsafe_b64decode(raw + b'=' * (-len(raw) % 4))
+    if len(decoded) != 8:
+        raise ValueError("Invalid user ID.")
+    return int.from_bytes(decoded, 'big')
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    Refresh token that also honours blacklist markers stored in the cache.
+    """
+
+    def check_blacklist(self):
+        if cache.get(blacklist_cache_key(self.payload[api_settings.JTI_CLAIM])):
+            raise TokenError("Token is blacklisted")
+        super().check_blacklist()
@@ -1,17 +1,10 @@
-from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from django.utils import timezone
+from django.db import transaction
 from django.contrib.auth import get_user_model
-from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes, force_str
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from .serializers import (
     RegisterSerializer, 
@@ -22,9 +15,19 @@ from .serializers import (
     EmailVerificationSerializer,
     ResendVerificationEmailSerializer
 )
+from .tasks import (
+    send_verification_email_task,
+    send_password_reset_email_task,
+    blacklist_refresh_token_task
+)
+from .tokens import CachedBlacklistRefreshToken, cache_is_shared, mark_blacklisted, decode_uid
+from .throttles import EmailAddressRateThrottle, EmailSendIPRateThrottle
 
 User = get_user_model()
 
+# Default throttles plus per-address and per-IP limits on email-sending endpoints
+EMAIL_SEND_THROTTLES = [*APIView.throttle_classes, EmailAddressRateThrottle, EmailSendIPRateThrottle]
+
 class RegisterView(generics.CreateAPIView):
     """
     API view for user registration with email verification.
@@ -36,42 +39,15 @@ class RegisterView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        # The verification email is queued by the users post_save signal
         user = serializer.save()
         
-        # Send verification email
-        self.send_verification_email(user)
-        
         return Response({
             "message": "User registered successfully. Please check your email to verify your account.",
             "user_id": user.id,
             "username": user.username,
             "email": user.email
         }, status=status.HTTP_201_CREATED)
-    
-    def send_verification_email(self, user):
-        """
-        Send verification email to the user.
-        """
-        verification_url = f"{settings.FRONTEND_URL}/verify-email/{user.email_verification_token}"
-        
-        context = {
-            'user': user,
-            'verification_url': verification_url,
-            'site_name': 'Plum Classification System',
-            'expiration_hours': 48
-        }
-        
-        html_message = render_to_string('authentication/email_verification.html', context)
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject='Verify your email address',
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False
-        )
 
 
 class VerifyEmailView(APIView):
@@ -84,17 +60,18 @@ class VerifyEmailView(APIView):
         serializer = EmailVerificationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        token = serializer.validated_data['token']
-        user = User.objects.filter(email_verification_token=token).first()
+        # User resolved while validating the token
+        user = serializer.user
         
-        if not user:
-            return Response({"error": "Invalid verification token."}, status=status.HTTP_400_BAD_REQUEST)
+        # Activate user and consume the token in a single conditional UPDATE:
+        # a concurrent request that already used the token updates no row
+        updated = User.objects.filter(
+            pk=user.pk,
+            email_verification_token=user.email_verification_token
+        ).update(is_active=True, email_verified=True, email_verification_token=None)
         
-        # Activate user and mark email as verified
-        user.is_active = True
-        user.email_verified = True
-        user.email_verification_token = None
-        user.save()
+        if not updated:
+            return Response({"error": "Invalid verification token."}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             "message": "Email verified successfully. You can now log in.",
@@ -107,46 +84,20 @@ class ResendVerificationEmailView(APIView):
     API view for resending verification email.
     """
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = EMAIL_SEND_THROTTLES
     
     def post(self, request):
         serializer = ResendVerificationEmailSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        email = serializer.validated_data['email']
-        user = User.objects.filter(email=email).first()
+        # User resolved (and checked as unverified) while validating the email
+        user = serializer.user
         
-        if not user:
-            return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
-        
-        if user.email_verified:
-            return Response({"message": "Email is already verified."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Generate new verification token
-        user.generate_email_verification_token()
-        user.email_verification_sent_at = timezone.now()
-        user.save()
+        # Generate new verification token (saves its hash and the sent date)
+        token = user.generate_email_verification_token()
         
         # Send verification email
-        verification_url = f"{settings.FRONTEND_URL}/verify-email/{user.email_verification_token}"
-        
-        context = {
-            'user': user,
-            'verification_url': verification_url,
-            'site_name': 'Plum Classification System',
-            'expiration_hours': 48
-        }
-        
-        html_message = render_to_string('authentication/email_verification.html', context)
-        plain_message = strip_tags(html_message)
-        
-        send_mail(
-            subject='Verify your email address',
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False
-        )
+        transaction.on_commit(lambda: send_verification_email_task.delay(user.id, token))
         
         return Response({
             "message": "Verification email resent successfully. Please check your email."
@@ -169,8 +120,15 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh"]
-            token = RefreshToken(refresh_token)
-            token.blacklist()
+            token = CachedBlacklistRefreshToken(refresh_token)
+            
+            if cache_is_shared():
+                # Revoke immediately through the shared cache, persist the blacklist in the background
+                mark_blacklisted(token)
+                blacklist_refresh_token_task.delay(token[jwt_settings.JTI_CLAIM], token['exp'])
+            else:
+                # A process-local marker would not reach other workers: blacklist now
+                token.blacklist()
             return Response({"message": "Logout successful."}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -194,7 +152,7 @@ class ChangePasswordView(APIView):
         
         # Set new password
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password'])
         
         return Response({"message": "Password changed successfully."}, status=status.HTTP_200_OK)
 
@@ -204,40 +162,22 @@ class PasswordResetRequestView(APIView):
     API view for requesting password reset.
     """
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = EMAIL_SEND_THROTTLES
     
     def post(self, request):
         serializer = PasswordResetRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
+        # Only the primary key is needed: the task loads the user to render the email
         email = serializer.validated_data['email']
-        user = User.objects.filter(email=email).first()
+        user = User.objects.filter(email__iexact=email).only('pk').first()
         
-        if user:
-            # Generate password reset token
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            token = default_token_generator.make_token(user)
+        if user is not None:
+            # Generate a reset token (only its hash is stored)
+            token = user.generate_password_reset_token()
             
             # Send password reset email
-            reset_url = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}"
-            
-            context = {
-                'user': user,
-                'reset_url': reset_url,
-                'site_name': 'Plum Classification System',
-                'expiration_hours': 24
-            }
-            
-            html_message = render_to_string('authentication/password_reset_email.html', context)
-            plain_message = strip_tags(html_message)
-            
-            send_mail(
-                subject='Reset your password',
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                html_message=html_message,
-                fail_silently=False
-            )
+            transaction.on_commit(lambda: send_password_reset_email_task.delay(user.pk, token))
         
         # Always return success to prevent email enumeration
         return Response({
@@ -256,18 +196,31 @@ class PasswordResetConfirmView(APIView):
         serializer.is_valid(raise_exception=True)
         
         try:
-            uid = force_str(urlsafe_base64_decode(serializer.validated_data['uid']))
-            user = User.objects.get(pk=uid)
-        except (TypeError, ValueError, OverflowError, User.DoesNotExist):
+            uid = decode_uid(serializer.validated_data['uid'])
+        except ValueError:
             return Response({"error": "Invalid user ID."}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check token validity
-        if not default_token_generator.check_token(user, serializer.validated_data['token']):
-            return Response({"error": "Invalid or expired token."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Set new password
-        user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        # Lock the user row so the token can only be consumed once
+        with transaction.atomic():
+            # Only the columns read or written below are fetched
+            user = (
+                User.objects.select_for_update()
+                .filter(pk=uid)
+                .only('id', 'password', 'password_reset_token', 'password_reset_sent_at')
+                .first()
+            )
+            if user is None:
+                return Response({"error": "Invalid user ID."}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Check token validity against the stored hash
+            if not user.password_reset_token_is_valid(serializer.validated_data['token']):
+                return Response({"error": "Invalid or expired token."}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Set new password and consume the token
+            user.set_password(serializer.validated_data['new_password'])
+            user.password_reset_token = None
+            user.password_reset_sent_at = None
+            user.save(update_fields=['password', 'password_reset_token', 'password_reset_sent_at'])
         
         return Response({"message": "Password reset successful. You can now log in with your new password."}, 
                         status=status.HTTP_200_OK)
@@ -8,10 +8,28 @@ import pandas as pd
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.db.models import Avg, Count, Sum, Q, F, ExpressionWrapper, fields
-from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, TruncDay, TruncWeek, TruncMonth
 
-from plum_classifier.models import PlumClassification, PlumBatch, ModelVersion
+from plum_classifier.models import CLASS_LABELS, PlumClassification, PlumBatch, ModelVersion
 from users.models import Farm, User
+from .cache import cached_analytics
+
+# Fonctions de troncature des dates par période d'agrégation
+_PERIOD_TRUNC = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Tranches de la distribution des scores de confiance : (libellé, borne basse incluse, borne haute exclue)
+_CONFIDENCE_BUCKETS = (
+    ('0.9-1.0', 0.9, None),
+    ('0.8-0.9', 0.8, 0.9),
+    ('0.7-0.8', 0.7, 0.8),
+    ('0.6-0.7', 0.6, 0.7),
+    ('0.5-0.6', 0.5, 0.6),
+    ('0.0-0.5', None, 0.5),
+)
 
 
 class DashboardAnalytics:
@@ -43,15 +61,8 @@ class DashboardAnalytics:
         if end_date:
             queryset = queryset.filter(**{f"{date_field}__lte": end_date})
             
-        # Déterminer la fonction de troncature selon la période
-        if period == 'day':
-            trunc_func = TruncDay(date_field)
-        elif period == 'week':
-            trunc_func = TruncWeek(date_field)
-        elif period == 'month':
-            trunc_func = TruncMonth(date_field)
-        else:
-            trunc_func = TruncDay(date_field)
+        # Déterminer la fonction de troncature selon la période (jour par défaut)
+        trunc_func = _PERIOD_TRUNC.get(period, TruncDay)(date_field)
             
         # Préparer l'agrégation
         if value_field:
@@ -102,6 +113,7 @@ class DashboardAnalytics:
             return result
     
     @staticmethod
+    @cached_analytics('quality_trends')
     def get_quality_trends(farm_id=None, start_date=None, end_date=None, period='week'):
         """
         Génère des tendances de qualité des prunes au fil du temps.
@@ -133,6 +145,7 @@ class DashboardAnalytics:
         )
     
     @staticmethod
+    @cached_analytics('farm_comparison')
     def get_farm_comparison(user_id=None, metric='quality_score'):
         """
         Compare les performances des fermes selon une métrique spécifiée.
@@ -148,25 +161,33 @@ class DashboardAnalytics:
         farms = Farm.objects.all()
         if user_id:
             farms = farms.filter(owner_id=user_id)
-            
+        
+        # Agréger toutes les fermes en une seule requête groupée
+        classifications = PlumClassification.objects.all()
+        if user_id:
+            classifications = classifications.filter(farm__owner_id=user_id)
+        
+        stats_by_farm = {
+            row['farm_id']: row
+            for row in classifications.filter(farm__isnull=False).order_by().values('farm_id').annotate(
+                total=Count('id'),
+                good_quality=Count('id', filter=Q(class_name='bonne_qualite')),
+                avg_confidence=Avg('confidence_score'),
+            )
+        }
+        
         result = []
+        if not stats_by_farm:
+            return result
         
-        for farm in farms:
-            # Récupérer les classifications pour cette ferme
-            farm_classifications = PlumClassification.objects.filter(farm=farm)
+        # Les fermes sans classification sont ignorées
+        for farm in farms.filter(id__in=list(stats_by_farm)).only('id', 'name', 'location'):
+            stats = stats_by_farm[farm.id]
+            total_classifications = stats['total']
             
-            # Calculer les métriques
-            total_classifications = farm_classifications.count()
-            
-            if total_classifications == 0:
-                continue
-                
-            # Calculer le score de qualité (pourcentage de "bonne_qualite")
-            good_quality_count = farm_classifications.filter(class_name='bonne_qualite').count()
-            quality_score = (good_quality_count / total_classifications) * 100 if total_classifications > 0 else 0
-            
-            # Calculer l'efficacité (confiance moyenne)
-            avg_confidence = farm_classifications.aggregate(Avg('confidence_score'))['confidence_score__avg'] or 0
+            # Score de qualité (pourcentage de "bonne_qualite") et efficacité (confiance moyenne)
+            quality_score = (stats['good_quality'] / total_classifications) * 100
+            avg_confidence = stats['avg_confidence'] or 0
             
             # Ajouter les données à la liste de résultats
             farm_data = {
@@ -188,6 +209,7 @@ class DashboardAnalytics:
         return result
     
     @staticmethod
+    @cached_analytics('quality_prediction')
     def predict_quality_distribution(farm_id=None, days_ahead=7):
         """
         Prédit la distribution de qualité future basée sur les tendances historiques.
@@ -209,9 +231,11 @@ class DashboardAnalytics:
         thirty_days_ago = timezone.now() - timedelta(days=30)
         recent_data = queryset.filter(created_at__gte=thirty_days_ago)
         
-        # Compter les occurrences par classe
-        class_counts = {}
-        total = recent_data.count()
+        # Compter les occurrences par classe en une seule requête groupée
+        class_counts = dict(
+            recent_data.order_by('class_name').values_list('class_name').annotate(count=Count('id'))
+        )
+        total = sum(class_counts.values())
         
         if total == 0:
             return {
@@ -221,15 +245,11 @@ class DashboardAnalytics:
                 'method': 'moving_average'
             }
             
-        for classification in recent_data:
-            class_name = classification.class_name
-            class_counts[class_name] = class_counts.get(class_name, 0) + 1
-            
         # Calculer les pourcentages
-        class_percentages = {}
-        for class_name, count in class_counts.items():
-            percentage = (count / total) * 100
-            class_percentages[class_name] = round(percentage, 2)
+        class_percentages = {
+            class_name: round((count / total) * 100, 2)
+            for class_name, count in class_counts.items()
+        }
             
         # Pour une prédiction simple, nous utilisons la distribution actuelle
         # Une implémentation plus avancée utiliserait des séries temporelles ou du ML
@@ -242,6 +262,7 @@ class DashboardAnalytics:
         }
     
     @staticmethod
+    @cached_analytics('activity_heatmap')
     def get_user_activity_heatmap(days=30):
         """
         Génère un heatmap d'activité utilisateur par jour et heure.
@@ -256,30 +277,33 @@ class DashboardAnalytics:
         start_date = timezone.now() - timedelta(days=days)
         classifications = PlumClassification.objects.filter(created_at__gte=start_date)
         
-        # Initialiser la matrice de heatmap (jours de la semaine x heures)
-        heatmap = [[0 for _ in range(24)] for _ in range(7)]
+        # Compter en base par jour ISO de la semaine (1 = lundi) et par heure :
+        # au plus 7 x 24 lignes au lieu d'une ligne par classification
+        rows = classifications.order_by().annotate(
+            day_of_week=ExtractIsoWeekDay('created_at'),
+            hour_of_day=ExtractHour('created_at')
+        ).values_list('day_of_week', 'hour_of_day').annotate(count=Count('id'))
         
-        # Remplir la matrice
-        for classification in classifications:
-            day_of_week = classification.created_at.weekday()  # 0-6 (lundi-dimanche)
-            hour_of_day = classification.created_at.hour  # 0-23
-            
-            heatmap[day_of_week][hour_of_day] += 1
+        # Remplir la matrice (jours de la semaine x heures) en une seule affectation
+        heatmap = np.zeros((7, 24), dtype=np.int64)
+        cells = np.array(list(rows), dtype=np.int64).reshape(-1, 3)
+        heatmap[cells[:, 0] - 1, cells[:, 1]] = cells[:, 2]
             
         # Formater les résultats
         days_labels = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
         hours_labels = [f"{h}h" for h in range(24)]
         
         result = {
-            'data': heatmap,
+            'data': heatmap.tolist(),
             'days': days_labels,
             'hours': hours_labels,
-            'max_value': max([max(row) for row in heatmap]) if heatmap else 0
+            'max_value': int(heatmap.max())
         }
         
         return result
     
     @staticmethod
+    @cached_analytics('classification_accuracy')
     def get_classification_accuracy_metrics(model_version_id=None):
         """
         Calcule des métriques d'exactitude pour les classifications.
@@ -298,32 +322,37 @@ class DashboardAnalytics:
             # Cette fonctionnalité nécessiterait d'ajouter un champ model_version à PlumClassification
             pass
             
-        # Calculer la confiance moyenne globale
-        avg_confidence = queryset.aggregate(Avg('confidence_score'))['confidence_score__avg'] or 0
-        
-        # Calculer la confiance moyenne par classe
-        confidence_by_class = {}
+        # Toutes les métriques sont calculées en un seul parcours : agrégats
+        # conditionnels pour chaque classe et chaque tranche de confiance
+        aggregations = {
+            'total': Count('id'),
+            'avg_confidence': Avg('confidence_score'),
+        }
+        for class_key in CLASS_LABELS:
+            aggregations[f'avg_{class_key}'] = Avg('confidence_score', filter=Q(class_name=class_key))
+        for index, (label, low, high) in enumerate(_CONFIDENCE_BUCKETS):
+            bucket_filter = Q(confidence_score__lt=high) if high is not None else Q()
+            if low is not None:
+                bucket_filter &= Q(confidence_score__gte=low)
+            aggregations[f'bucket_{index}'] = Count('id', filter=bucket_filter)
         
-        class_choices = dict(PlumClassification.CLASS_CHOICES)
+        metrics = queryset.aggregate(**aggregations)
+        avg_confidence = metrics['avg_confidence'] or 0
         
-        for class_key, class_name in class_choices.items():
-            class_queryset = queryset.filter(class_name=class_key)
-            class_avg = class_queryset.aggregate(Avg('confidence_score'))['confidence_score__avg'] or 0
-            confidence_by_class[class_name] = round(class_avg, 4)
+        # Confiance moyenne par classe
+        confidence_by_class = {
+            str(class_name): round(metrics[f'avg_{class_key}'] or 0, 4)
+            for class_key, class_name in CLASS_LABELS.items()
+        }
             
-        # Calculer la distribution des scores de confiance
+        # Distribution des scores de confiance
         confidence_distribution = {
-            '0.9-1.0': queryset.filter(confidence_score__gte=0.9).count(),
-            '0.8-0.9': queryset.filter(confidence_score__gte=0.8, confidence_score__lt=0.9).count(),
-            '0.7-0.8': queryset.filter(confidence_score__gte=0.7, confidence_score__lt=0.8).count(),
-            '0.6-0.7': queryset.filter(confidence_score__gte=0.6, confidence_score__lt=0.7).count(),
-            '0.5-0.6': queryset.filter(confidence_score__gte=0.5, confidence_score__lt=0.6).count(),
-            '0.0-0.5': queryset.filter(confidence_score__lt=0.5).count(),
+            label: metrics[f'bucket_{index}'] for index, (label, low, high) in enumerate(_CONFIDENCE_BUCKETS)
         }
         
         return {
             'average_confidence': round(avg_confidence, 4),
             'confidence_by_class': confidence_by_class,
             'confidence_distribution': confidence_distribution,
-            'total_classifications': queryset.count()
+            'total_classifications': metrics['total']
         }
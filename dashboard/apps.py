@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        """
+        Importe les signaux d'invalidation du cache lorsque l'application est prête.
+        """
+        import dashboard.signals  # noqa
@@ -0,0 +1,91 @@
+"""
+Cache des données de dashboard.
+
+Les clés incluent un numéro de génération global : incrémenter ce numéro rend
+obsolètes toutes les entrées existantes sans avoir à les énumérer.
+"""
+
+import functools
+import hashlib
+import time
+
+from django.core.cache import cache
+
+# Durée de vie des données de dashboard en cache (en secondes)
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# Durée de vie des analyses de dashboard en cache (en secondes)
+ANALYTICS_CACHE_TIMEOUT = 180
+
+_GENERATION_KEY = 'dashboard:generation'
+
+
+def get_dashboard_generation():
+    """
+    Retourne le numéro de génération courant du cache de dashboard.
+    
+    Returns:
+        int: Numéro de génération
+    """
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        # Valeur initiale basée sur l'horloge : jamais égale à une génération passée
+        cache.add(_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(_GENERATION_KEY, 0)
+    return generation
+
+
+def dashboard_cache_key(role, user_id=None):
+    """
+    Construit la clé de cache d'un dashboard.
+    
+    Args:
+        role: Rôle du dashboard ('admin', 'technician', 'farmer')
+        user_id: ID de l'utilisateur pour les dashboards personnels
+        
+    Returns:
+        str: Clé de cache
+    """
+    generation = get_dashboard_generation()
+    if user_id is None:
+        return f"dashboard:{role}:{generation}"
+    return f"dashboard:{role}:{user_id}:{generation}"
+
+
+def cached_analytics(key_prefix, timeout=ANALYTICS_CACHE_TIMEOUT):
+    """
+    Décorateur mettant en cache le résultat d'une analyse de dashboard.
+    
+    La clé combine le préfixe, la génération courante et une empreinte des
+    arguments : invalidate_dashboards() rend donc aussi ces entrées obsolètes.
+    
+    Args:
+        key_prefix: Préfixe identifiant l'analyse
+        timeout: Durée de vie du cache en secondes
+        
+    Usage:
+        @staticmethod
+        @cached_analytics('quality_trends')
+        def get_quality_trends(farm_id=None, period='week'):
+            ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            payload = repr((args, sorted(kwargs.items())))
+            digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+            cache_key = f"analytics:{key_prefix}:{get_dashboard_generation()}:{digest}"
+            return cache.get_or_set(cache_key, lambda: func(*args, **kwargs), timeout)
+        return wrapper
+    return decorator
+
+
+def invalidate_dashboards():
+    """
+    Invalide toutes les données de dashboard en cache.
+    """
+    try:
+        cache.incr(_GENERATION_KEY)
+    except ValueError:
+        # Clé absente (expirée ou cache vidé) : repartir d'une nouvelle génération
+        cache.set(_GENERATION_KEY, time.time_ns(), None)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.rollups import compute_dashboard_rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcule les agrégats de dashboard stockés dans DashboardMetric."
+
+    def handle(self, *args, **options):
+        count = compute_dashboard_rollups()
+        self.stdout.write(self.style.SUCCESS(f"{count} agrégat(s) de dashboard enregistré(s)."))
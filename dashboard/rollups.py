@@ -0,0 +1,101 @@
+"""
+Agrégats précalculés des analyses de dashboard.
+
+Une tâche périodique calcule les analyses les plus demandées et les stocke dans
+DashboardMetric ; les endpoints lisent alors une seule ligne au lieu de parcourir
+les classifications. Un agrégat trop ancien, ou calculé avant la dernière
+modification des données (génération du cache de dashboard), est ignoré :
+l'analyse est alors calculée à la demande.
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from plum_classifier.models import PlumClassification
+from .analytics import DashboardAnalytics
+from .cache import get_dashboard_generation
+from .models import DashboardMetric
+
+# Intervalle de recalcul des agrégats (planification celery beat)
+ROLLUP_INTERVAL = timedelta(minutes=5)
+
+# Âge au-delà duquel un agrégat n'est plus servi
+ROLLUP_MAX_AGE = 2 * ROLLUP_INTERVAL
+
+# Génération du cache de dashboard au début du dernier calcul des agrégats
+_ROLLUP_GENERATION_KEY = 'dashboard:rollups:generation'
+
+# Périodes précalculées pour les tendances de qualité
+ROLLUP_PERIODS = ('day', 'week', 'month')
+
+
+def _compute_rollups():
+    """
+    Génère les agrégats à stocker.
+
+    Les analyses sont appelées sans leur cache pour refléter l'état courant.
+
+    Yields:
+        tuple: (type de métrique, ID de ferme ou None, période, valeur)
+    """
+    get_quality_trends = DashboardAnalytics.get_quality_trends.__wrapped__
+    farm_ids = list(
+        PlumClassification.objects.filter(farm__isnull=False)
+        .order_by().values_list('farm_id', flat=True).distinct()
+    )
+
+    for period in ROLLUP_PERIODS:
+        yield 'quality_trends', None, period, get_quality_trends(period=period)
+        for farm_id in farm_ids:
+            yield 'quality_trends', farm_id, period, get_quality_trends(farm_id=farm_id, period=period)
+
+    yield 'farm_comparison', None, 'all', DashboardAnalytics.get_farm_comparison.__wrapped__()
+    yield 'classification_accuracy', None, 'all', DashboardAnalytics.get_classification_accuracy_metrics.__wrapped__()
+
+
+def compute_dashboard_rollups():
+    """
+    Recalcule et enregistre tous les agrégats de dashboard.
+
+    Returns:
+        int: Nombre d'agrégats enregistrés
+    """
+    # Relevée avant le calcul : une écriture concurrente rend les agrégats obsolètes
+    generation = get_dashboard_generation()
+    count = 0
+    for metric_type, farm_id, time_period, value in _compute_rollups():
+        DashboardMetric.objects.update_or_create(
+            metric_type=metric_type,
+            farm_id=farm_id,
+            user=None,
+            time_period=time_period,
+            defaults={'name': metric_type, 'value': value}
+        )
+        count += 1
+    cache.set(_ROLLUP_GENERATION_KEY, generation, None)
+    return count
+
+
+def get_rollup(metric_type, farm_id=None, time_period='all'):
+    """
+    Retourne la valeur d'un agrégat précalculé encore frais.
+
+    Args:
+        metric_type: Type de métrique
+        farm_id: ID de ferme optionnel
+        time_period: Période de l'agrégat
+
+    Returns:
+        La valeur stockée, ou None si l'agrégat est absent ou obsolète
+    """
+    if cache.get(_ROLLUP_GENERATION_KEY) != get_dashboard_generation():
+        return None
+    return DashboardMetric.objects.filter(
+        metric_type=metric_type,
+        farm_id=farm_id,
+        user__isnull=True,
+        time_period=time_period,
+        updated_at__gte=timezone.now() - ROLLUP_MAX_AGE
+    ).values_list('value', flat=True).first()
@@ -21,6 +21,53 @@ class DashboardPreferenceSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'updated_at')
 
 
+class SystemPerformanceSerializer(serializers.Serializer):
+    """
+    Serializer pour les indicateurs de performance du système.
+    """
+    average_processing_time = serializers.FloatField()
+    api_response_time = serializers.FloatField()
+    model_version = serializers.CharField()
+    model_accuracy = serializers.FloatField()
+
+
+class FarmPerformanceSerializer(serializers.Serializer):
+    """
+    Serializer pour la répartition des classifications d'une ferme.
+    """
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    total_classifications = serializers.IntegerField()
+    class_counts = serializers.DictField(child=serializers.IntegerField())
+    class_percentages = serializers.DictField(child=serializers.FloatField())
+
+
+class FarmStatsSerializer(FarmPerformanceSerializer):
+    """
+    Serializer pour les statistiques d'une ferme du dashboard agriculteur.
+    """
+    location = serializers.CharField()
+    total_batches = serializers.IntegerField()
+    pending_batches = serializers.IntegerField()
+
+
+class FarmQualityShareSerializer(serializers.Serializer):
+    """
+    Serializer pour la part d'une catégorie de qualité dans une ferme.
+    """
+    farm_id = serializers.IntegerField()
+    farm_name = serializers.CharField()
+    percentage = serializers.FloatField()
+
+
+class FarmQualityTrendSerializer(serializers.Serializer):
+    """
+    Serializer pour la part d'une catégorie de qualité dans chaque ferme.
+    """
+    category = serializers.CharField()
+    data = FarmQualityShareSerializer(many=True)
+
+
 class AdminDashboardSerializer(serializers.Serializer):
     """
     Serializer pour les données du dashboard administrateur.
@@ -33,7 +80,7 @@ class AdminDashboardSerializer(serializers.Serializer):
     total_users = serializers.IntegerField()
     users_by_role = serializers.DictField(child=serializers.IntegerField())
     active_users = serializers.IntegerField()
-    system_performance = serializers.DictField()
+    system_performance = SystemPerformanceSerializer()
 
 
 class TechnicianDashboardSerializer(serializers.Serializer):
@@ -46,8 +93,8 @@ class TechnicianDashboardSerializer(serializers.Serializer):
     class_percentages = serializers.DictField(child=serializers.FloatField())
     recent_classifications = PlumClassificationSerializer(many=True)
     managed_farms = serializers.IntegerField()
-    farm_performance = serializers.ListField(child=serializers.DictField())
-    quality_trends = serializers.ListField(child=serializers.DictField())
+    farm_performance = FarmPerformanceSerializer(many=True)
+    quality_trends = FarmQualityTrendSerializer(many=True)
 
 
 class FarmerDashboardSerializer(serializers.Serializer):
@@ -59,7 +106,7 @@ class FarmerDashboardSerializer(serializers.Serializer):
     class_distribution = serializers.DictField(child=serializers.IntegerField())
     class_percentages = serializers.DictField(child=serializers.FloatField())
     recent_classifications = PlumClassificationSerializer(many=True)
-    farms = serializers.ListField(child=serializers.DictField())
+    farms = FarmStatsSerializer(many=True)
     total_batches = serializers.IntegerField()
     pending_batches = serializers.IntegerField()
 
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from plum_classifier.models import PlumClassification, PlumBatch
+from users.models import Farm
+from .cache import invalidate_dashboards
+
+
+@receiver(post_save, sender=PlumClassification)
+@receiver(post_delete, sender=PlumClassification)
+@receiver(post_save, sender=PlumBatch)
+@receiver(post_delete, sender=PlumBatch)
+@receiver(post_save, sender=Farm)
+@receiver(post_delete, sender=Farm)
+def invalidate_dashboard_cache(sender, **kwargs):
+    """
+    Invalide le cache des dashboards lorsque les données agrégées changent.
+    """
+    invalidate_dashboards()
@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from .rollups import compute_dashboard_rollups
+
+
+@shared_task
+def compute_dashboard_rollups_task():
+    """
+    Recalcule les agrégats de dashboard stockés dans DashboardMetric.
+    """
+    return compute_dashboard_rollups()
@@ -2,7 +2,9 @@ from django.shortcuts import render
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Avg, Count, Q
+from drf_spectacular.utils import extend_schema
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from datetime import timedelta
 
@@ -21,10 +23,104 @@ from .serializers import (
     ClassificationAccuracySerializer
 )
 from .analytics import DashboardAnalytics
+from .cache import DASHBOARD_CACHE_TIMEOUT, dashboard_cache_key
+from .rollups import get_rollup
+from api.optimizations import AutoPrefetchMixin
 from users.models import User, Farm
-from plum_classifier.models import PlumClassification, PlumBatch, ModelVersion
+from plum_classifier.models import CLASS_LABELS, PlumClassification, PlumBatch, ModelVersion
 from plum_classifier.serializers import PlumClassificationSerializer
 
+
+def _class_breakdown(counts, total):
+    """
+    Convertit des effectifs par classe en effectifs et pourcentages par libellé.
+    
+    Args:
+        counts: Dictionnaire {valeur de classe: effectif}
+        total: Effectif total
+        
+    Returns:
+        tuple: (effectifs par libellé, pourcentages par libellé)
+    """
+    class_counts = {}
+    class_percentages = {}
+    for class_name, count in counts.items():
+        label = str(CLASS_LABELS.get(class_name, class_name))
+        class_counts[label] = count
+        class_percentages[label] = round((count / total) * 100, 2) if total > 0 else 0
+    return class_counts, class_percentages
+
+
+def _classification_overview(queryset):
+    """
+    Calcule les statistiques globales d'un ensemble de classifications
+    en une seule requête groupée par classe.
+    
+    Args:
+        queryset: Le queryset de classifications
+        
+    Returns:
+        dict: total, confiance moyenne, temps de traitement moyen,
+              effectifs et pourcentages par classe
+    """
+    rows = queryset.order_by().values('class_name').annotate(
+        count=Count('id'),
+        confidence_sum=Sum('confidence_score'),
+        processing_sum=Sum('processing_time'),
+        processing_count=Count('processing_time'),
+    )
+    
+    counts = {}
+    total = confidence_sum = processing_sum = processing_count = 0
+    for row in rows:
+        counts[row['class_name']] = row['count']
+        total += row['count']
+        confidence_sum += row['confidence_sum'] or 0
+        processing_sum += row['processing_sum'] or 0
+        processing_count += row['processing_count']
+    
+    class_counts, class_percentages = _class_breakdown(counts, total)
+    return {
+        'total': total,
+        'average_confidence': confidence_sum / total if total else 0,
+        'average_processing_time': processing_sum / processing_count if processing_count else 0,
+        'class_counts': class_counts,
+        'class_percentages': class_percentages,
+    }
+
+
+def _class_counts_by_farm(queryset):
+    """
+    Compte les classifications par ferme et par classe en une seule requête.
+    
+    Args:
+        queryset: Le queryset de classifications
+        
+    Returns:
+        dict: {ID de ferme: {valeur de classe: effectif}}
+    """
+    counts_by_farm = {}
+    rows = queryset.order_by().values('farm_id', 'class_name').annotate(count=Count('id'))
+    for row in rows:
+        counts_by_farm.setdefault(row['farm_id'], {})[row['class_name']] = row['count']
+    return counts_by_farm
+
+
+def _recent_classifications(queryset, limit=10):
+    """
+    Sérialise les classifications les plus récentes avec leurs relations préchargées.
+    
+    Args:
+        queryset: Le queryset de classifications
+        limit: Nombre de classifications à retourner
+        
+    Returns:
+        list: Classifications sérialisées
+    """
+    recent = PlumClassificationSerializer.setup_eager_loading(queryset.order_by('-created_at'))[:limit]
+    return PlumClassificationSerializer(recent, many=True).data
+
+
 class DashboardViewSet(viewsets.ViewSet):
     """
     ViewSet pour les données du dashboard.
@@ -53,51 +149,82 @@ class DashboardViewSet(viewsets.ViewSet):
         else:  # farmer ou autre
             return self.farmer_dashboard(request)
     
+    @extend_schema(responses={200: AdminDashboardSerializer})
     @action(detail=False, methods=['get'])
     def admin_dashboard(self, request):
         """
         Retourne les données du dashboard pour les administrateurs.
         """
-        # Récupérer les statistiques de classification
-        classifications = PlumClassification.objects.all()
-        total_classifications = classifications.count()
+        dashboard_data = cache.get_or_set(
+            dashboard_cache_key('admin'),
+            self._build_admin_dashboard,
+            DASHBOARD_CACHE_TIMEOUT
+        )
         
-        # Calculer la confiance moyenne
-        avg_confidence = 0
-        if total_classifications > 0:
-            avg_confidence = classifications.aggregate(Avg('confidence_score'))['confidence_score__avg'] or 0
+        # Les données sont déjà sérialisées : le serializer ne sert qu'à la documentation
+        return Response(dashboard_data)
+    
+    @extend_schema(responses={200: TechnicianDashboardSerializer})
+    @action(detail=False, methods=['get'])
+    def technician_dashboard(self, request):
+        """
+        Retourne les données du dashboard pour les techniciens.
+        """
+        dashboard_data = cache.get_or_set(
+            dashboard_cache_key('technician'),
+            self._build_technician_dashboard,
+            DASHBOARD_CACHE_TIMEOUT
+        )
         
-        # Calculer la distribution des classes
-        class_counts = {}
-        for classification in classifications:
-            class_name = classification.get_class_name_display()
-            class_counts[class_name] = class_counts.get(class_name, 0) + 1
+        # Les données sont déjà sérialisées : le serializer ne sert qu'à la documentation
+        return Response(dashboard_data)
+    
+    @extend_schema(responses={200: FarmerDashboardSerializer})
+    @action(detail=False, methods=['get'])
+    def farmer_dashboard(self, request):
+        """
+        Retourne les données du dashboard pour les agriculteurs.
+        """
+        user = request.user
+        dashboard_data = cache.get_or_set(
+            dashboard_cache_key('farmer', user.id),
+            lambda: self._build_farmer_dashboard(user),
+            DASHBOARD_CACHE_TIMEOUT
+        )
         
-        # Calculer les pourcentages
-        class_percentages = {}
-        for class_name, count in class_counts.items():
-            percentage = (count / total_classifications) * 100 if total_classifications > 0 else 0
-            class_percentages[class_name] = round(percentage, 2)
+        # Les données sont déjà sérialisées : le serializer ne sert qu'à la documentation
+        return Response(dashboard_data)
+    
+    def _build_admin_dashboard(self):
+        """
+        Calcule les données du dashboard pour les administrateurs.
         
-        # Récupérer les classifications récentes
-        recent_classifications = classifications.order_by('-created_at')[:10]
-        recent_data = PlumClassificationSerializer(recent_classifications, many=True).data
+        Returns:
+            dict: Données du dashboard
+        """
+        # Récupérer les statistiques de classification (une seule requête groupée)
+        classifications = PlumClassification.objects.all()
+        overview = _classification_overview(classifications)
         
-        # Statistiques des utilisateurs
-        users = User.objects.all()
-        total_users = users.count()
+        # Récupérer les classifications récentes
+        recent_data = _recent_classifications(classifications)
         
-        # Distribution par rôle
+        # Statistiques des utilisateurs : total, actifs (connectés dans les 30 derniers
+        # jours) et distribution par rôle, en une seule agrégation
+        thirty_days_ago = timezone.now() - timedelta(days=30)
+        user_stats = User.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(last_login__gte=thirty_days_ago)),
+            **{
+                role: Count('id', filter=Q(role=role))
+                for role in ('admin', 'technician', 'farmer')
+            }
+        )
         users_by_role = {
-            'admin': users.filter(role='admin').count(),
-            'technician': users.filter(role='technician').count(),
-            'farmer': users.filter(role='farmer').count(),
+            role: user_stats[role]
+            for role in ('admin', 'technician', 'farmer')
         }
         
-        # Utilisateurs actifs (connectés dans les 30 derniers jours)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        active_users = users.filter(last_login__gte=thirty_days_ago).count()
-        
         # Informations sur le modèle actif
         active_model = ModelVersion.objects.filter(is_active=True).first()
         model_info = {
@@ -108,7 +235,7 @@ class DashboardViewSet(viewsets.ViewSet):
         
         # Performance du système
         system_performance = {
-            'average_processing_time': classifications.aggregate(Avg('processing_time'))['processing_time__avg'] or 0,
+            'average_processing_time': overview['average_processing_time'],
             'api_response_time': 0.2,  # Valeur fictive, à remplacer par une mesure réelle
             'model_version': model_info['version'],
             'model_accuracy': model_info['accuracy'],
@@ -116,75 +243,47 @@ class DashboardViewSet(viewsets.ViewSet):
         
         # Assembler les données
         dashboard_data = {
-            'total_classifications': total_classifications,
-            'average_confidence': avg_confidence,
-            'class_distribution': class_counts,
-            'class_percentages': class_percentages,
+            'total_classifications': overview['total'],
+            'average_confidence': overview['average_confidence'],
+            'class_distribution': overview['class_counts'],
+            'class_percentages': overview['class_percentages'],
             'recent_classifications': recent_data,
-            'total_users': total_users,
+            'total_users': user_stats['total'],
             'users_by_role': users_by_role,
-            'active_users': active_users,
+            'active_users': user_stats['active'],
             'system_performance': system_performance,
         }
         
-        serializer = AdminDashboardSerializer(dashboard_data)
-        return Response(serializer.data)
+        return dashboard_data
     
-    @action(detail=False, methods=['get'])
-    def technician_dashboard(self, request):
+    def _build_technician_dashboard(self):
         """
-        Retourne les données du dashboard pour les techniciens.
-        """
-        user = request.user
+        Calcule les données du dashboard pour les techniciens.
         
+        Returns:
+            dict: Données du dashboard
+        """
         # Récupérer les statistiques de classification
         # Pour un technicien, on pourrait filtrer selon les fermes qu'il gère
         # mais pour simplifier, on utilise toutes les classifications
         classifications = PlumClassification.objects.all()
-        total_classifications = classifications.count()
-        
-        # Calculer la confiance moyenne
-        avg_confidence = 0
-        if total_classifications > 0:
-            avg_confidence = classifications.aggregate(Avg('confidence_score'))['confidence_score__avg'] or 0
-        
-        # Calculer la distribution des classes
-        class_counts = {}
-        for classification in classifications:
-            class_name = classification.get_class_name_display()
-            class_counts[class_name] = class_counts.get(class_name, 0) + 1
-        
-        # Calculer les pourcentages
-        class_percentages = {}
-        for class_name, count in class_counts.items():
-            percentage = (count / total_classifications) * 100 if total_classifications > 0 else 0
-            class_percentages[class_name] = round(percentage, 2)
+        overview = _classification_overview(classifications)
         
         # Récupérer les classifications récentes
-        recent_classifications = classifications.order_by('-created_at')[:10]
-        recent_data = PlumClassificationSerializer(recent_classifications, many=True).data
+        recent_data = _recent_classifications(classifications)
         
         # Fermes gérées (dans un cas réel, il faudrait une relation entre technicien et fermes)
         # Pour simplifier, on suppose que le technicien a accès à toutes les fermes
-        farms = Farm.objects.all()
-        managed_farms = farms.count()
+        farms = list(Farm.objects.all())
+        managed_farms = len(farms)
         
-        # Performance des fermes
+        # Performance des fermes (effectifs par ferme et par classe en une requête)
+        counts_by_farm = _class_counts_by_farm(classifications)
         farm_performance = []
         for farm in farms:
-            farm_classifications = classifications.filter(farm=farm)
-            farm_total = farm_classifications.count()
-            
-            # Calculer les pourcentages par classe pour cette ferme
-            farm_class_counts = {}
-            for classification in farm_classifications:
-                class_name = classification.get_class_name_display()
-                farm_class_counts[class_name] = farm_class_counts.get(class_name, 0) + 1
-            
-            farm_class_percentages = {}
-            for class_name, count in farm_class_counts.items():
-                percentage = (count / farm_total) * 100 if farm_total > 0 else 0
-                farm_class_percentages[class_name] = round(percentage, 2)
+            farm_counts = counts_by_farm.get(farm.id, {})
+            farm_total = sum(farm_counts.values())
+            farm_class_counts, farm_class_percentages = _class_breakdown(farm_counts, farm_total)
             
             farm_performance.append({
                 'id': farm.id,
@@ -194,104 +293,78 @@ class DashboardViewSet(viewsets.ViewSet):
                 'class_percentages': farm_class_percentages,
             })
         
-        # Tendances de qualité (exemple simplifié)
+        # Tendances de qualité : pourcentage de chaque catégorie par ferme
         quality_trends = []
-        categories = ['Bonne qualité', 'Non mûre', 'Tachetée', 'Fissurée', 'Meurtrie', 'Pourrie']
-        
-        for category in categories:
-            trend = {
+        for category in map(str, CLASS_LABELS.values()):
+            quality_trends.append({
                 'category': category,
-                'data': []
-            }
-            
-            for farm in farms:
-                farm_classifications = classifications.filter(farm=farm)
-                farm_total = farm_classifications.count()
-                category_count = farm_classifications.filter(class_name__icontains=category.lower()).count()
-                percentage = (category_count / farm_total) * 100 if farm_total > 0 else 0
-                
-                trend['data'].append({
-                    'farm_id': farm.id,
-                    'farm_name': farm.name,
-                    'percentage': round(percentage, 2)
-                })
-            
-            quality_trends.append(trend)
+                'data': [
+                    {
+                        'farm_id': performance['id'],
+                        'farm_name': performance['name'],
+                        'percentage': performance['class_percentages'].get(category, 0.0)
+                    }
+                    for performance in farm_performance
+                ]
+            })
         
         # Assembler les données
         dashboard_data = {
-            'total_classifications': total_classifications,
-            'average_confidence': avg_confidence,
-            'class_distribution': class_counts,
-            'class_percentages': class_percentages,
+            'total_classifications': overview['total'],
+            'average_confidence': overview['average_confidence'],
+            'class_distribution': overview['class_counts'],
+            'class_percentages': overview['class_percentages'],
             'recent_classifications': recent_data,
             'managed_farms': managed_farms,
             'farm_performance': farm_performance,
             'quality_trends': quality_trends,
         }
         
-        serializer = TechnicianDashboardSerializer(dashboard_data)
-        return Response(serializer.data)
+        return dashboard_data
     
-    @action(detail=False, methods=['get'])
-    def farmer_dashboard(self, request):
-        """
-        Retourne les données du dashboard pour les agriculteurs.
+    def _build_farmer_dashboard(self, user):
         """
-        user = request.user
+        Calcule les données du dashboard pour un agriculteur.
         
+        Args:
+            user: L'agriculteur connecté
+            
+        Returns:
+            dict: Données du dashboard
+        """
         # Récupérer les fermes de l'agriculteur
-        farms = Farm.objects.filter(owner=user)
+        farms = list(Farm.objects.filter(owner=user))
         
         # Récupérer les classifications pour les fermes de l'agriculteur
-        classifications = PlumClassification.objects.filter(farm__in=farms)
-        total_classifications = classifications.count()
-        
-        # Calculer la confiance moyenne
-        avg_confidence = 0
-        if total_classifications > 0:
-            avg_confidence = classifications.aggregate(Avg('confidence_score'))['confidence_score__avg'] or 0
-        
-        # Calculer la distribution des classes
-        class_counts = {}
-        for classification in classifications:
-            class_name = classification.get_class_name_display()
-            class_counts[class_name] = class_counts.get(class_name, 0) + 1
-        
-        # Calculer les pourcentages
-        class_percentages = {}
-        for class_name, count in class_counts.items():
-            percentage = (count / total_classifications) * 100 if total_classifications > 0 else 0
-            class_percentages[class_name] = round(percentage, 2)
+        classifications = PlumClassification.objects.filter(farm__owner=user)
+        overview = _classification_overview(classifications)
         
         # Récupérer les classifications récentes
-        recent_classifications = classifications.order_by('-created_at')[:10]
-        recent_data = PlumClassificationSerializer(recent_classifications, many=True).data
+        recent_data = _recent_classifications(classifications)
+        
+        # Statistiques des fermes : classifications et lots regroupés par ferme
+        counts_by_farm = _class_counts_by_farm(classifications)
+        batch_counts = {
+            row['farm_id']: row
+            for row in PlumBatch.objects.filter(farm__owner=user).order_by().values('farm_id').annotate(
+                total=Count('id'),
+                pending=Count('id', filter=Q(status='pending'))
+            )
+        }
         
-        # Statistiques des fermes
         farm_stats = []
         total_batches = 0
         pending_batches = 0
         
         for farm in farms:
-            farm_classifications = classifications.filter(farm=farm)
-            farm_total = farm_classifications.count()
-            
-            # Calculer les pourcentages par classe pour cette ferme
-            farm_class_counts = {}
-            for classification in farm_classifications:
-                class_name = classification.get_class_name_display()
-                farm_class_counts[class_name] = farm_class_counts.get(class_name, 0) + 1
-            
-            farm_class_percentages = {}
-            for class_name, count in farm_class_counts.items():
-                percentage = (count / farm_total) * 100 if farm_total > 0 else 0
-                farm_class_percentages[class_name] = round(percentage, 2)
+            farm_counts = counts_by_farm.get(farm.id, {})
+            farm_total = sum(farm_counts.values())
+            farm_class_counts, farm_class_percentages = _class_breakdown(farm_counts, farm_total)
             
-            # Récupérer les lots de la ferme
-            batches = PlumBatch.objects.filter(farm=farm)
-            farm_batches = batches.count()
-            farm_pending = batches.filter(status='pending').count()
+            # Lots de la ferme
+            farm_batch_counts = batch_counts.get(farm.id, {})
+            farm_batches = farm_batch_counts.get('total', 0)
+            farm_pending = farm_batch_counts.get('pending', 0)
             
             total_batches += farm_batches
             pending_batches += farm_pending
@@ -309,24 +382,24 @@ class DashboardViewSet(viewsets.ViewSet):
         
         # Assembler les données
         dashboard_data = {
-            'total_classifications': total_classifications,
-            'average_confidence': avg_confidence,
-            'class_distribution': class_counts,
-            'class_percentages': class_percentages,
+            'total_classifications': overview['total'],
+            'average_confidence': overview['average_confidence'],
+            'class_distribution': overview['class_counts'],
+            'class_percentages': overview['class_percentages'],
             'recent_classifications': recent_data,
             'farms': farm_stats,
             'total_batches': total_batches,
             'pending_batches': pending_batches,
         }
         
-        serializer = FarmerDashboardSerializer(dashboard_data)
-        return Response(serializer.data)
+        return dashboard_data
 
 
-class DashboardPreferenceViewSet(viewsets.ModelViewSet):
+class DashboardPreferenceViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les préférences de dashboard des utilisateurs.
     """
+    queryset = DashboardPreference.objects.all()
     serializer_class = DashboardPreferenceSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -334,7 +407,7 @@ class DashboardPreferenceViewSet(viewsets.ModelViewSet):
         """
         Retourne uniquement les préférences de l'utilisateur connecté.
         """
-        return DashboardPreference.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
     
     def perform_create(self, serializer):
         """
@@ -379,12 +452,17 @@ class DashboardAnalyticsViewSet(viewsets.ViewSet):
         end_date = request.query_params.get('end_date')
         period = request.query_params.get('period', 'week')
         
-        trends = DashboardAnalytics.get_quality_trends(
-            farm_id=farm_id, 
-            start_date=start_date, 
-            end_date=end_date, 
-            period=period
-        )
+        # Sans bornes de dates, l'agrégat précalculé suffit
+        trends = None
+        if not start_date and not end_date:
+            trends = get_rollup('quality_trends', farm_id=farm_id or None, time_period=period)
+        if trends is None:
+            trends = DashboardAnalytics.get_quality_trends(
+                farm_id=farm_id, 
+                start_date=start_date, 
+                end_date=end_date, 
+                period=period
+            )
         
         return Response(trends)
     
@@ -402,10 +480,15 @@ class DashboardAnalyticsViewSet(viewsets.ViewSet):
             
         metric = request.query_params.get('metric', 'quality_score')
         
-        comparison = DashboardAnalytics.get_farm_comparison(
-            user_id=user_id,
-            metric=metric
-        )
+        # L'agrégat précalculé couvre toutes les fermes, triées par score de qualité
+        comparison = None
+        if user_id is None and metric == 'quality_score':
+            comparison = get_rollup('farm_comparison')
+        if comparison is None:
+            comparison = DashboardAnalytics.get_farm_comparison(
+                user_id=user_id,
+                metric=metric
+            )
         
         return Response(comparison)
     
@@ -442,9 +525,14 @@ class DashboardAnalyticsViewSet(viewsets.ViewSet):
         """
         model_version_id = request.query_params.get('model_version_id')
         
-        metrics = DashboardAnalytics.get_classification_accuracy_metrics(
-            model_version_id=model_version_id
-        )
+        # L'agrégat précalculé ne couvre pas le filtrage par version du modèle
+        metrics = None
+        if not model_version_id:
+            metrics = get_rollup('classification_accuracy')
+        if metrics is None:
+            metrics = DashboardAnalytics.get_classification_accuracy_metrics(
+                model_version_id=model_version_id
+            )
         
         return Response(metrics)
     
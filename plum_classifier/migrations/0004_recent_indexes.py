@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-16 04:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plum_classifier', '0003_notification_indexes'),
+        ('users', '0004_alter_farm_options_alter_user_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plumbatch',
+            index=models.Index(fields=['farm', '-created_at'], name='batch_farm_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plumclassification',
+            index=models.Index(fields=['-created_at'], name='classif_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plumclassification',
+            index=models.Index(fields=['uploaded_by', '-created_at'], name='classif_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plumclassification',
+            index=models.Index(fields=['farm', '-created_at'], name='classif_farm_created_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-16 04:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plum_classifier', '0004_recent_indexes'),
+        ('users', '0007_user_password_reset_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='plumclassification',
+            name='classif_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='plumclassification',
+            name='classif_farm_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='plumclassification',
+            index=models.Index(fields=['-created_at', 'class_name'], name='classif_created_class_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plumclassification',
+            index=models.Index(fields=['farm', '-created_at', 'class_name'], name='classif_farm_created_class_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plumclassification',
+            index=models.Index(fields=['class_name', 'confidence_score'], name='classif_class_conf_idx'),
+        ),
+    ]
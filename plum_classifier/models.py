@@ -31,6 +31,10 @@ class PlumBatch(models.Model):
         verbose_name = _('lot de prunes')
         verbose_name_plural = _('lots de prunes')
         ordering = ['-created_at']
+        indexes = [
+            # Lots les plus récents d'une ferme (listes et tableaux de bord)
+            models.Index(fields=['farm', '-created_at'], name='batch_farm_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.farm.name}"
@@ -39,14 +43,19 @@ class PlumBatch(models.Model):
         """
         Met à jour le résumé de classification basé sur les classifications individuelles.
         """
-        classifications = self.classifications.all()
-        self.total_plums = classifications.count()
+        # Effectifs et somme des scores par classe en une seule requête groupée
+        rows = self.classifications.order_by('class_name').values('class_name').annotate(
+            count=models.Count('id'),
+            confidence_sum=models.Sum('confidence_score')
+        )
         
         # Calculer la distribution de qualité
         quality_counts = {}
-        for classification in classifications:
-            class_name = classification.class_name
-            quality_counts[class_name] = quality_counts.get(class_name, 0) + 1
+        confidence_sum = 0
+        for row in rows:
+            quality_counts[row['class_name']] = row['count']
+            confidence_sum += row['confidence_sum']
+        self.total_plums = sum(quality_counts.values())
         
         # Calculer les pourcentages
         quality_distribution = {}
@@ -63,7 +72,7 @@ class PlumBatch(models.Model):
         self.classification_summary = {
             'total_plums': self.total_plums,
             'quality_distribution': quality_distribution,
-            'average_confidence': self.get_average_confidence(),
+            'average_confidence': round(confidence_sum / self.total_plums, 4) if self.total_plums else 0,
             'last_updated': self.updated_at.isoformat() if self.updated_at else None
         }
         
@@ -77,12 +86,8 @@ class PlumBatch(models.Model):
         """
         Calcule la confiance moyenne pour toutes les classifications de ce lot.
         """
-        classifications = self.classifications.all()
-        if not classifications:
-            return 0
-        
-        total_confidence = sum(c.confidence_score for c in classifications)
-        return round(total_confidence / classifications.count(), 4)
+        average = self.classifications.aggregate(average=models.Avg('confidence_score'))['average']
+        return round(average, 4) if average is not None else 0
 
 
 class PlumClassification(models.Model):
@@ -125,6 +130,16 @@ class PlumClassification(models.Model):
         verbose_name = _('classification de prune')
         verbose_name_plural = _('classifications de prunes')
         ordering = ['-created_at']
+        indexes = [
+            # Classifications récentes (ORDER BY created_at DESC LIMIT n) et analyses
+            # par période groupées par classe, sans lecture de la table
+            models.Index(fields=['-created_at', 'class_name'], name='classif_created_class_idx'),
+            # Classifications récentes d'un utilisateur ou d'une ferme
+            models.Index(fields=['uploaded_by', '-created_at'], name='classif_user_created_idx'),
+            models.Index(fields=['farm', '-created_at', 'class_name'], name='classif_farm_created_class_idx'),
+            # Confiance moyenne et distribution des scores par classe
+            models.Index(fields=['class_name', 'confidence_score'], name='classif_class_conf_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_class_name_display()} ({self.confidence_score:.2f})"
@@ -140,6 +155,32 @@ class PlumClassification(models.Model):
             self.batch.update_classification_summary()
 
 
+# Libellés des classes, indexés par valeur stockée
+CLASS_LABELS = dict(PlumClassification.CLASS_CHOICES)
+
+
+class NotificationQuerySet(models.QuerySet):
+    """
+    QuerySet personnalisé pour les notifications.
+    """
+    
+    def mark_all_read(self, user_id, ids=None):
+        """
+        Marque comme lues les notifications d'un utilisateur en une seule requête UPDATE.
+        
+        Args:
+            user_id: ID de l'utilisateur destinataire
+            ids: Liste optionnelle d'IDs à marquer (toutes les non lues par défaut)
+            
+        Returns:
+            int: Nombre de notifications mises à jour
+        """
+        queryset = self.filter(user_id=user_id, is_read=False)
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        return queryset.update(is_read=True)
+
+
 class Notification(models.Model):
     """
     Modèle pour les notifications utilisateur.
@@ -164,10 +205,22 @@ class Notification(models.Model):
     # Timestamps
     created_at = models.DateTimeField(_('créé le'), auto_now_add=True)
     
+    objects = NotificationQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('notification')
         verbose_name_plural = _('notifications')
         ordering = ['-created_at']
+        indexes = [
+            # Liste des notifications d'un utilisateur, filtrée par statut de lecture
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+            # Index partiel, limité aux notifications non lues
+            models.Index(
+                fields=['user', '-created_at'],
+                name='notif_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db.models import Count
 from .models import PlumBatch, PlumClassification, Notification, ModelVersion
 from users.serializers import UserSerializer, FarmSerializer
 
@@ -18,6 +19,19 @@ class PlumClassificationSerializer(serializers.ModelSerializer):
                   'device_info', 'geo_location', 'created_at')
         read_only_fields = ('id', 'uploaded_by', 'uploaded_by_details', 'created_at')
     
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Précharge les relations utilisées par les champs imbriqués du serializer.
+        
+        Args:
+            queryset: Le queryset de classifications
+            
+        Returns:
+            QuerySet: Le queryset avec les jointures nécessaires
+        """
+        return queryset.select_related('uploaded_by', 'farm__owner')
+    
     def create(self, validated_data):
         """
         Crée une nouvelle classification en définissant l'utilisateur qui l'a téléchargée.
@@ -44,11 +58,30 @@ class PlumBatchSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_by', 'created_by_details', 'classification_summary',
                            'total_plums', 'quality_distribution', 'created_at', 'updated_at')
     
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Précharge les relations imbriquées et annote le nombre de classifications.
+        
+        Args:
+            queryset: Le queryset de lots
+            
+        Returns:
+            QuerySet: Le queryset avec les jointures et annotations nécessaires
+        """
+        return queryset.select_related('farm__owner', 'created_by').annotate(
+            classifications_total=Count('classifications')
+        )
+    
     def get_classifications_count(self, obj):
         """
         Retourne le nombre de classifications dans ce lot.
         """
-        return obj.classifications.count()
+        # Utiliser l'annotation si le queryset a été préparé par setup_eager_loading
+        count = getattr(obj, 'classifications_total', None)
+        if count is None:
+            count = obj.classifications.count()
+        return count
     
     def create(self, validated_data):
         """
@@ -6,15 +6,18 @@ from django.conf import settings
 import os
 import uuid
 import logging
+from django.db.models import Count, Sum
 from django.utils import timezone
 
-from .models import PlumClassification, PlumBatch, ModelVersion
+from api.optimizations import AutoPrefetchMixin
+
+from .models import CLASS_LABELS, PlumClassification, PlumBatch, ModelVersion
 from .serializers import PlumClassificationSerializer, PlumBatchSerializer, ModelVersionSerializer
 from .services import PlumClassifierService
 
 logger = logging.getLogger(__name__)
 
-class PlumClassificationViewSet(viewsets.ModelViewSet):
+class PlumClassificationViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     """
     ViewSet pour la classification des prunes.
     """
@@ -28,16 +31,18 @@ class PlumClassificationViewSet(viewsets.ModelViewSet):
         Les administrateurs peuvent voir toutes les classifications.
         """
         user = self.request.user
+        queryset = super().get_queryset()
         if user.is_staff or user.is_admin_user:
-            return PlumClassification.objects.all()
+            return queryset
         
         # Les agriculteurs ne voient que leurs propres classifications
-        if user.is_farmer:
-            return PlumClassification.objects.filter(uploaded_by=user)
+        elif user.is_farmer:
+            return queryset.filter(uploaded_by=user)
         
         # Les techniciens peuvent voir les classifications des fermes qu'ils gèrent
         # (cette logique serait à implémenter selon les besoins spécifiques)
-        return PlumClassification.objects.filter(uploaded_by=user)
+        else:
+            return queryset.filter(uploaded_by=user)
     
     @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
     def classify(self, request):
@@ -113,13 +118,19 @@ class PlumClassificationViewSet(viewsets.ModelViewSet):
         if end_date:
             queryset = queryset.filter(created_at__lte=end_date)
         
-        # Calculer les statistiques
-        total_count = queryset.count()
-        class_counts = {}
+        # Calculer les statistiques en une seule requête groupée par classe,
+        # sans charger les classifications en mémoire
+        rows = queryset.order_by('class_name').values('class_name').annotate(
+            count=Count('id'),
+            confidence_sum=Sum('confidence_score')
+        )
         
-        for classification in queryset:
-            class_name = classification.get_class_name_display()
-            class_counts[class_name] = class_counts.get(class_name, 0) + 1
+        class_counts = {}
+        total_count = confidence_sum = 0
+        for row in rows:
+            class_counts[str(CLASS_LABELS.get(row['class_name'], row['class_name']))] = row['count']
+            total_count += row['count']
+            confidence_sum += row['confidence_sum']
         
         # Calculer les pourcentages
         class_percentages = {}
@@ -128,9 +139,7 @@ class PlumClassificationViewSet(viewsets.ModelViewSet):
             class_percentages[class_name] = round(percentage, 2)
         
         # Calculer la confiance moyenne
-        avg_confidence = 0
-        if total_count > 0:
-            avg_confidence = queryset.aggregate(models.Avg('confidence_score'))['confidence_score__avg']
+        avg_confidence = confidence_sum / total_count if total_count > 0 else 0
         
         return Response({
             'total_classifications': total_count,
@@ -144,7 +153,7 @@ class PlumClassificationViewSet(viewsets.ModelViewSet):
         })
 
 
-class PlumBatchViewSet(viewsets.ModelViewSet):
+class PlumBatchViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les lots de prunes.
     """
@@ -157,16 +166,18 @@ class PlumBatchViewSet(viewsets.ModelViewSet):
         Les administrateurs peuvent voir tous les lots.
         """
         user = self.request.user
+        queryset = super().get_queryset()
         if user.is_staff or user.is_admin_user:
-            return PlumBatch.objects.all()
+            return queryset
         
         # Les agriculteurs ne voient que leurs propres lots
-        if user.is_farmer:
-            return PlumBatch.objects.filter(farm__owner=user)
+        elif user.is_farmer:
+            return queryset.filter(farm__owner=user)
         
         # Les techniciens peuvent voir les lots des fermes qu'ils gèrent
         # (cette logique serait à implémenter selon les besoins spécifiques)
-        return PlumBatch.objects.filter(created_by=user)
+        else:
+            return queryset.filter(created_by=user)
     
     @action(detail=True, methods=['post'], parser_classes=[MultiPartParser])
     def classify_batch(self, request, pk=None):
@@ -241,12 +252,12 @@ class PlumBatchViewSet(viewsets.ModelViewSet):
         Retourne toutes les classifications d'un lot.
         """
         batch = self.get_object()
-        classifications = batch.classifications.all()
+        classifications = PlumClassificationSerializer.setup_eager_loading(batch.classifications.all())
         serializer = PlumClassificationSerializer(classifications, many=True)
         return Response(serializer.data)
 
 
-class ModelVersionViewSet(viewsets.ModelViewSet):
+class ModelVersionViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les versions du modèle.
     """
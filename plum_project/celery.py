@@ -0,0 +1,20 @@
+"""
+Configuration de l'application Celery du projet.
+
+Sans CELERY_BROKER_URL, les tâches s'exécutent de manière synchrone
+(CELERY_TASK_ALWAYS_EAGER) : aucun broker n'est alors nécessaire.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plum_project.settings')
+
+app = Celery('plum_project')
+
+# Lire la configuration depuis les settings Django (préfixe CELERY_)
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Découvrir automatiquement les modules tasks.py des applications installées
+app.autodiscover_tasks()
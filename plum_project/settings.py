@@ -115,6 +115,18 @@ DATABASES = {
     )
 }
 
+# Réplica en lecture optionnel : les lectures éligibles y sont routées
+if os.getenv("REPLICA_DATABASE_URL"):
+    DATABASES["replica"] = dj_database_url.parse(
+        os.getenv("REPLICA_DATABASE_URL"),
+        conn_max_age=600,
+        conn_health_checks=True,
+    )
+    # Pendant les tests, le réplica pointe sur la base de test principale
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+
 
 # Cache configuration
 if os.getenv('REDIS_URL'):
@@ -125,12 +137,18 @@ if os.getenv('REDIS_URL'):
             'OPTIONS': {
                 'CLIENT_CLASS': 'django_redis.client.DefaultClient',
                 'IGNORE_EXCEPTIONS': True,  # Ignorer les erreurs Redis pour éviter les pannes
+                # Pool de connexions partagé par processus, plafonné pour borner les descripteurs
+                'CONNECTION_POOL_KWARGS': {
+                    'max_connections': int(os.getenv('REDIS_MAX_CONNECTIONS', '100')),
+                },
             },
             'KEY_PREFIX': 'plum_api'
         }
     }
 else:
     # Utiliser le cache en mémoire si Redis n'est pas configuré
+    # (cache propre à chaque processus : la déconnexion révoque alors les jetons
+    # de manière synchrone, sans marqueur en cache)
     CACHES = {
         "default": {
             "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
@@ -153,6 +171,22 @@ if os.getenv('CELERY_BROKER_URL'):
     CELERY_TASK_REJECT_ON_WORKER_LOST = True
     CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
     CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
+    
+    # Tâches périodiques (celery beat)
+    CELERY_BEAT_SCHEDULE = {
+        'purge-expired-tokens': {
+            'task': 'authentication.tasks.purge_expired_tokens',
+            'schedule': timedelta(hours=1),
+        },
+        'compute-dashboard-rollups': {
+            'task': 'dashboard.tasks.compute_dashboard_rollups_task',
+            'schedule': timedelta(minutes=5),
+        },
+    }
+else:
+    # Sans broker, les tâches s'exécutent immédiatement dans le processus courant
+    # (une erreur d'envoi d'email ne fait pas échouer la requête)
+    CELERY_TASK_ALWAYS_EAGER = True
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -175,6 +209,15 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hachage des mots de passe : Argon2id par défaut, les anciens hachages PBKDF2
+# restent vérifiables et sont mis à niveau à la prochaine connexion
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
 
@@ -217,11 +260,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.backends.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_THROTTLE_CLASSES': [
@@ -230,7 +277,10 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
-        'user': '1000/day'
+        'user': '1000/day',
+        # Endpoints envoyant un email (vérification, réinitialisation du mot de passe)
+        'email_send': '3/hour',
+        'email_send_ip': '20/hour',
     },
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'EXCEPTION_HANDLER': 'api.exception_handler.custom_exception_handler',
@@ -255,8 +305,12 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.CustomTokenRefreshSerializer',
 }
 
+# Durée (en secondes) pendant laquelle un jeton d'accès vérifié est mis en cache
+JWT_AUTH_CACHE_TTL = int(os.getenv('JWT_AUTH_CACHE_TTL', '5'))
+
 # CORS settings
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
@@ -1,19 +1,53 @@
 import unittest
-from django.test import TestCase, Client
+from unittest import mock
+from django.test import TestCase, Client, SimpleTestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
 import os
+import re
 import json
+import logging
+from datetime import timedelta
+from django.utils import timezone
 
-from users.models import Farm
-from plum_classifier.models import PlumBatch, PlumClassification
-from dashboard.models import DashboardPreference
-from api.optimizations import query_debugger, cached_queryset, optimize_queryset
+from users.models import Farm, hash_token
+from plum_classifier.models import PlumBatch, PlumClassification, Notification
+from dashboard.models import DashboardMetric, DashboardPreference
+from dashboard.cache import dashboard_cache_key
+from dashboard.analytics import DashboardAnalytics
+from dashboard.rollups import get_rollup
+from dashboard.views import DashboardAnalyticsViewSet
+from django.core.management import call_command
+from api.optimizations import query_debugger, QueryDebugger, cached_queryset, optimize_queryset, batch_process, auto_optimize, AutoPrefetchMixin
+from plum_classifier.serializers import PlumBatchSerializer
 from api.security import FileSecurity, InputValidation
-from api.utils import ResponseBuilder, ServiceBase
+from api.utils import ResponseBuilder, ServiceBase, log_method_calls, validate_required_fields, custom_exception_handler as format_exception
+from rest_framework.exceptions import ValidationError as DRFValidationError, NotFound, AuthenticationFailed
+from api.exception_handler import custom_exception_handler
+from api.renderers import ORJSONRenderer
+from api.db_routers import ReplicaRouter, use_replica
+from django.db import connections
+from rest_framework.renderers import JSONRenderer
+from authentication.backends import CachedJWTAuthentication, clear_token_cache
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.test import APIRequestFactory
+from django.core import mail
+from django.core.cache import cache
+from authentication.views import RegisterView, PasswordResetRequestView, PasswordResetConfirmView, VerifyEmailView
+from authentication.tasks import blacklist_refresh_token_task, purge_expired_tokens, send_password_reset_email_task
+from authentication.serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer
+from authentication.tokens import mark_blacklisted, encode_uid, decode_uid
+from authentication.views import LogoutView
+from rest_framework.test import force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 
 User = get_user_model()
 
@@ -57,6 +91,43 @@ class SecurityTests(TestCase):
             self.assertFalse(settings.CORS_ALLOW_ALL_ORIGINS)
             self.assertTrue(hasattr(settings, 'CORS_ALLOWED_ORIGINS'))
     
+    def test_cached_jwt_authentication(self):
+        """Teste la mise en cache des jetons d'accès vérifiés."""
+        clear_token_cache()
+        token = str(AccessToken.for_user(self.user))
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        backend = CachedJWTAuthentication()
+        
+        user, validated_token = backend.authenticate(request)
+        self.assertEqual(user, self.user)
+        
+        # Le second appel ne vérifie plus la signature ni ne recharge l'utilisateur
+        with self.assertNumQueries(0):
+            cached_user, cached_token = backend.authenticate(request)
+        self.assertEqual(cached_user, self.user)
+        self.assertIsNot(cached_user, user)
+        self.assertEqual(cached_token['user_id'], validated_token['user_id'])
+        clear_token_cache()
+    
+    def test_cached_jwt_authentication_deactivated_user(self):
+        """Teste qu'un utilisateur désactivé n'est plus servi depuis le cache."""
+        clear_token_cache()
+        token = str(AccessToken.for_user(self.user))
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        backend = CachedJWTAuthentication()
+        backend.authenticate(request)
+        
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        with self.assertRaises(AuthenticationFailed):
+            backend.authenticate(request)
+        clear_token_cache()
+    
+    def test_password_hasher(self):
+        """Teste que les mots de passe sont hachés avec Argon2."""
+        self.assertTrue(self.user.password.startswith('argon2$argon2id$'))
+        self.assertTrue(self.user.check_password('testpassword123'))
+    
     def test_file_security_validation(self):
         """Teste les fonctions de validation de sécurité des fichiers."""
         # Créer un fichier de test
@@ -73,6 +144,23 @@ class SecurityTests(TestCase):
         # Nettoyer
         os.remove(test_file_path)
     
+    def test_file_type_validation(self):
+        """Teste la détection du type MIME des fichiers."""
+        png_header = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+        png_file = SimpleUploadedFile('test.png', png_header, content_type='image/png')
+        self.assertTrue(FileSecurity.validate_file_type(png_file))
+        self.assertEqual(png_file.tell(), 0)
+        
+        # Un fichier texte déguisé en image est refusé
+        text_file = SimpleUploadedFile('test.jpg', b'test content', content_type='image/jpeg')
+        with self.assertRaises(ValidationError):
+            FileSecurity.validate_file_type(text_file)
+    
+    def test_sanitize_filename(self):
+        """Teste le nettoyage des noms de fichiers."""
+        self.assertEqual(FileSecurity.sanitize_filename('prune été 01.jpg'), 'prune__t__01.jpg')
+        self.assertEqual(len(FileSecurity.sanitize_filename('a' * 150 + '.png')), 104)
+    
     def test_input_validation(self):
         """Teste les fonctions de validation des entrées utilisateur."""
         # Tester la validation des coordonnées
@@ -84,6 +172,20 @@ class SecurityTests(TestCase):
         
         # Tester la validation réussie
         self.assertTrue(InputValidation.validate_coordinates(45, 90))
+        
+        # Tester la validation groupée des coordonnées
+        self.assertTrue(InputValidation.validate_coordinates_bulk([45, -10.5], [90, 120]))
+        with self.assertRaises(ValidationError):
+            InputValidation.validate_coordinates_bulk([45, 100], [90, 50])
+        
+        # Tester le nettoyage du HTML
+        cleaned = InputValidation.sanitize_html('<p onclick="x">ok<script>alert(1)</script></p>')
+        self.assertEqual(cleaned, '<p>ok</p>')
+        
+        # Tester la validation des numéros de téléphone
+        self.assertTrue(InputValidation.validate_phone_number('+33 (6) 12-34-56-78'))
+        with self.assertRaises(ValidationError):
+            InputValidation.validate_phone_number('12ab')
 
 
 class PerformanceTests(TestCase):
@@ -116,6 +218,18 @@ class PerformanceTests(TestCase):
         farms = Farm.objects.all()
         self.assertGreaterEqual(farms.count(), 1)
     
+    def test_query_debugger_context(self):
+        """Teste le gestionnaire de contexte QueryDebugger."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection):
+            with self.assertLogs('api.optimizations', level='DEBUG') as logs:
+                with QueryDebugger('comptage'):
+                    Farm.objects.count()
+        
+        self.assertIn('DEBUG:api.optimizations:Nombre de requêtes: 1', logs.output)
+    
     def test_optimize_queryset(self):
         """Teste la fonction optimize_queryset."""
         # Créer quelques objets pour le test
@@ -131,7 +245,124 @@ class PerformanceTests(TestCase):
         
         # Vérifier que le queryset est bien optimisé
         self.assertEqual(optimized.query.select_related, {'farm': {}, 'created_by': {}})
+        
+        # Tester la restriction des colonnes, y compris à travers les relations
+        pruned = optimize_queryset(
+            queryset,
+            select_related=['farm'],
+            only_fields=['id', 'name', 'farm__name']
+        ).get()
+        self.assertEqual(pruned.get_deferred_fields() & {'name', 'description'}, {'description'})
+        with self.assertNumQueries(0):
+            self.assertEqual(pruned.farm.name, 'Test Farm')
+    
+    def test_auto_optimize(self):
+        """Teste la détection automatique des relations à précharger."""
+        PlumBatch.objects.create(name='Test Batch', farm=self.farm, created_by=self.user)
+        
+        optimized = auto_optimize(PlumBatch.objects.all(), PlumBatchSerializer)
+        self.assertEqual(optimized.query.select_related, {'farm': {'owner': {}}, 'created_by': {}})
+        
+        # Les relations imbriquées ne déclenchent plus de requêtes supplémentaires
+        batch = optimized.get()
+        with self.assertNumQueries(0):
+            batch.farm.owner.username
+            batch.created_by.email
+    
+    def test_auto_prefetch_mixin(self):
+        """Teste le mixin appliquant le préchargement dérivé du serializer de la vue."""
+        from rest_framework.generics import ListAPIView
+        from users.serializers import FarmSerializer
+        
+        class FarmListView(AutoPrefetchMixin, ListAPIView):
+            queryset = Farm.objects.all()
+            serializer_class = FarmSerializer
+        
+        class BatchListView(AutoPrefetchMixin, ListAPIView):
+            queryset = PlumBatch.objects.all()
+            serializer_class = PlumBatchSerializer
+        
+        # Relations déduites des sources 'owner.username' et 'owner.email'
+        self.assertEqual(FarmListView().get_queryset().query.select_related, {'owner': {}})
+        # setup_eager_loading du serializer est prioritaire (annotation comprise)
+        batches = BatchListView().get_queryset()
+        self.assertIn('classifications_total', batches.query.annotations)
+    
+    def test_batch_serializer_eager_loading(self):
+        """Teste que la sérialisation d'une liste de lots ne génère pas de N+1."""
+        for i in range(3):
+            PlumBatch.objects.create(name=f'Batch {i}', farm=self.farm, created_by=self.user)
+        
+        queryset = PlumBatchSerializer.setup_eager_loading(PlumBatch.objects.all())
+        with self.assertNumQueries(1):
+            data = PlumBatchSerializer(queryset, many=True).data
+        self.assertEqual([item['classifications_count'] for item in data], [0, 0, 0])
+    
+    def test_cached_queryset(self):
+        """Teste le décorateur cached_queryset."""
+        calls = []
+        
+        @cached_queryset(timeout=60, key_prefix='test')
+        def join_args(*parts):
+            calls.append(parts)
+            return '|'.join(parts)
+        
+        # Des arguments différents ne doivent pas partager la même clé
+        self.assertEqual(join_args('a_b', 'c'), 'a_b|c')
+        self.assertEqual(join_args('a', 'b_c'), 'a|b_c')
+        
+        # Un appel identique est servi depuis le cache
+        self.assertEqual(join_args('a_b', 'c'), 'a_b|c')
+        self.assertEqual(len(calls), 2)
+    
+    def test_mark_all_read(self):
+        """Teste le marquage groupé des notifications comme lues."""
+        notifications = [
+            Notification.objects.create(user=self.user, title=f'Notif {i}', message='Test')
+            for i in range(3)
+        ]
+        
+        # Marquage ciblé, en une seule requête
+        with self.assertNumQueries(1):
+            updated = Notification.objects.mark_all_read(self.user.id, ids=[notifications[0].pk])
+        self.assertEqual(updated, 1)
+        
+        # Marquage de toutes les notifications restantes
+        self.assertEqual(Notification.objects.mark_all_read(self.user.id), 2)
+        self.assertFalse(Notification.objects.filter(user=self.user, is_read=False).exists())
+    
+    def test_batch_process(self):
+        """Teste la fonction batch_process."""
+        for i in range(5):
+            PlumBatch.objects.create(name=f'Batch {i}', farm=self.farm, created_by=self.user)
+        
+        batches = []
+        total = batch_process(PlumBatch.objects.all(), batch_size=2, callback=batches.append)
+        
+        # Tous les objets sont traités une seule fois, par lots ordonnés
+        self.assertEqual(total, 5)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        processed_ids = [obj.pk for batch in batches for obj in batch]
+        self.assertEqual(processed_ids, sorted(processed_ids))
 
+    
+    def test_batch_classification_summary(self):
+        """Teste le résumé d'un lot calculé par agrégation."""
+        batch = PlumBatch.objects.create(name='Summary Batch', farm=self.farm, created_by=self.user)
+        for class_name, confidence in [('bonne_qualite', 0.9), ('pourrie', 0.5), ('bonne_qualite', 0.7)]:
+            PlumClassification.objects.create(
+                image_path='test.jpg', uploaded_by=self.user, farm=self.farm, batch=batch,
+                class_name=class_name, confidence_score=confidence
+            )
+        
+        # Une requête groupée pour le résumé, une pour l'enregistrement du lot
+        with self.assertNumQueries(2):
+            batch.update_classification_summary()
+        self.assertEqual(batch.total_plums, 3)
+        self.assertEqual(batch.quality_distribution['bonne_qualite'], {'count': 2, 'percentage': 66.67})
+        self.assertEqual(batch.classification_summary['average_confidence'], 0.7)
+        self.assertEqual(batch.get_average_confidence(), 0.7)
+        self.assertEqual(batch.status, 'classified')
 
 class DashboardTests(APITestCase):
     """Tests pour les fonctionnalités du dashboard."""
@@ -189,6 +420,380 @@ class DashboardTests(APITestCase):
         self.assertIn('farms', response.data)
         self.assertIn('total_classifications', response.data)
         self.assertIn('average_confidence', response.data)
+    
+    def test_farmer_dashboard_with_classifications(self):
+        """Teste le dashboard agriculteur avec des classifications existantes."""
+        PlumClassification.objects.create(
+            image_path='test.jpg',
+            uploaded_by=self.user,
+            farm=self.farm,
+            class_name='bonne_qualite',
+            confidence_score=0.9
+        )
+        
+        response = self.client.get(reverse('farmer-dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_classifications'], 1)
+        self.assertEqual(response.data['class_distribution'], {'Bonne qualité': 1})
+        self.assertEqual(len(response.data['recent_classifications']), 1)
+    
+    def test_dashboard_cache_invalidation(self):
+        """Teste l'invalidation du cache des dashboards lors d'une modification."""
+        key = dashboard_cache_key('farmer', self.user.id)
+        self.assertEqual(dashboard_cache_key('farmer', self.user.id), key)
+        
+        # La création d'un lot rend obsolètes les clés existantes
+        PlumBatch.objects.create(name='Test Batch', farm=self.farm, created_by=self.user)
+        self.assertNotEqual(dashboard_cache_key('farmer', self.user.id), key)
+
+    
+    def test_farm_comparison(self):
+        """Teste la comparaison des fermes calculée en requêtes groupées."""
+        other_farm = Farm.objects.create(name='Other Farm', location='Elsewhere', owner=self.user)
+        Farm.objects.create(name='Empty Farm', location='Nowhere', owner=self.user)
+        for farm, class_name, confidence in [
+            (self.farm, 'bonne_qualite', 0.9),
+            (self.farm, 'pourrie', 0.7),
+            (other_farm, 'bonne_qualite', 0.8),
+        ]:
+            PlumClassification.objects.create(
+                image_path='test.jpg', uploaded_by=self.user, farm=farm,
+                class_name=class_name, confidence_score=confidence
+            )
+        
+        with self.assertNumQueries(2):
+            comparison = DashboardAnalytics.get_farm_comparison(user_id=self.user.id)
+        
+        # Les fermes sans classification sont exclues
+        self.assertEqual([farm['name'] for farm in comparison], ['Other Farm', 'Test Farm'])
+        self.assertEqual(comparison[1]['total_classifications'], 2)
+        self.assertEqual(comparison[1]['quality_score'], 50.0)
+        self.assertEqual(comparison[1]['efficiency'], 80.0)
+    
+    def test_cached_analytics(self):
+        """Teste la mise en cache des analyses et leur invalidation."""
+        PlumClassification.objects.create(
+            image_path='test.jpg', uploaded_by=self.user, farm=self.farm,
+            class_name='bonne_qualite', confidence_score=0.9
+        )
+        metrics = DashboardAnalytics.get_classification_accuracy_metrics()
+        with self.assertNumQueries(0):
+            self.assertEqual(DashboardAnalytics.get_classification_accuracy_metrics(), metrics)
+        
+        # Une nouvelle classification invalide les analyses en cache
+        PlumClassification.objects.create(
+            image_path='test.jpg', uploaded_by=self.user, farm=self.farm,
+            class_name='pourrie', confidence_score=0.6
+        )
+        self.assertEqual(DashboardAnalytics.get_classification_accuracy_metrics()['total_classifications'], 2)
+    
+    def test_activity_heatmap(self):
+        """Teste le heatmap d'activité agrégé par jour de la semaine et par heure."""
+        self.assertEqual(DashboardAnalytics.get_user_activity_heatmap()['max_value'], 0)
+        
+        classification = PlumClassification.objects.create(
+            image_path='test.jpg', uploaded_by=self.user, farm=self.farm,
+            class_name='bonne_qualite', confidence_score=0.9
+        )
+        created_at = classification.created_at
+        
+        heatmap = DashboardAnalytics.get_user_activity_heatmap()
+        self.assertEqual(heatmap['max_value'], 1)
+        self.assertEqual(heatmap['data'][created_at.weekday()][created_at.hour], 1)
+        self.assertEqual(sum(map(sum, heatmap['data'])), 1)
+    
+    def test_quality_prediction(self):
+        """Teste la distribution prédite à partir des classifications récentes."""
+        for class_name in ('bonne_qualite', 'bonne_qualite', 'bonne_qualite', 'pourrie'):
+            PlumClassification.objects.create(
+                image_path='test.jpg', uploaded_by=self.user, farm=self.farm,
+                class_name=class_name, confidence_score=0.9
+            )
+        
+        with self.assertNumQueries(1):
+            prediction = DashboardAnalytics.predict_quality_distribution(farm_id=self.farm.id)
+        self.assertEqual(prediction['predicted_distribution'], {'bonne_qualite': 75.0, 'pourrie': 25.0})
+        self.assertEqual(prediction['confidence'], 0.04)
+    
+    def test_dashboard_rollups(self):
+        """Teste le précalcul des analyses dans DashboardMetric."""
+        PlumClassification.objects.create(
+            image_path='test.jpg', uploaded_by=self.user, farm=self.farm,
+            class_name='bonne_qualite', confidence_score=0.9
+        )
+        call_command('compute_dashboard_rollups', stdout=io.StringIO())
+        
+        self.assertEqual(get_rollup('classification_accuracy'), DashboardAnalytics.get_classification_accuracy_metrics())
+        self.assertEqual(get_rollup('farm_comparison'), DashboardAnalytics.get_farm_comparison())
+        self.assertEqual(
+            get_rollup('quality_trends', farm_id=self.farm.id, time_period='month'),
+            DashboardAnalytics.get_quality_trends(farm_id=self.farm.id, period='month')
+        )
+        
+        # Les endpoints servent l'agrégat en une seule requête
+        request = APIRequestFactory().get('/', {'period': 'month'})
+        force_authenticate(request, user=self.user)
+        with self.assertNumQueries(1):
+            response = DashboardAnalyticsViewSet.as_view({'get': 'quality_trends'})(request)
+        self.assertEqual(response.data, get_rollup('quality_trends', time_period='month'))
+        
+        # Une requête filtrée par version du modèle ne lit pas l'agrégat
+        request = APIRequestFactory().get('/', {'model_version_id': 1})
+        force_authenticate(request, user=self.user)
+        with self.assertNumQueries(1):
+            DashboardAnalyticsViewSet.as_view({'get': 'classification_accuracy'})(request)
+        
+        # Un agrégat trop ancien est ignoré
+        DashboardMetric.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNone(get_rollup('classification_accuracy'))
+    
+    def test_dashboard_rollups_invalidated_by_writes(self):
+        """Teste qu'une modification des données rend les agrégats obsolètes."""
+        call_command('compute_dashboard_rollups', stdout=io.StringIO())
+        self.assertEqual(get_rollup('classification_accuracy')['total_classifications'], 0)
+        
+        PlumClassification.objects.create(
+            image_path='test.jpg', uploaded_by=self.user, farm=self.farm,
+            class_name='bonne_qualite', confidence_score=0.9
+        )
+        self.assertIsNone(get_rollup('classification_accuracy'))
+        
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=self.user)
+        response = DashboardAnalyticsViewSet.as_view({'get': 'classification_accuracy'})(request)
+        self.assertEqual(response.data['total_classifications'], 1)
+
+
+class AuthenticationTests(TestCase):
+    """Tests pour les flux d'authentification (emails, jetons)."""
+    
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        # Repartir de compteurs de limitation de débit vides
+        cache.clear()
+    
+    def test_register_sends_verification_email_after_commit(self):
+        """Teste que l'email de vérification part une fois l'utilisateur enregistré."""
+        request = self.factory.post('/api/auth/register/', {
+            'username': 'newfarmer',
+            'email': 'newfarmer@example.com',
+            'password': 'Str0ngPassw0rd!',
+            'confirm_password': 'Str0ngPassw0rd!',
+            'first_name': 'New',
+            'last_name': 'Farmer',
+        }, format='json')
+        
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = RegisterView.as_view()(request)
+            # Rien n'est envoyé avant la validation de la transaction
+            self.assertEqual(len(mail.outbox), 0)
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['newfarmer@example.com'])
+        # Le texte brut provient du template .txt : ni balises ni CSS
+        self.assertNotIn('<', mail.outbox[0].body)
+        self.assertNotIn('font-family', mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        user = User.objects.get(email='newfarmer@example.com')
+        self.assertFalse(user.is_active)
+        # Le lien contient le jeton en clair, la base n'en garde que l'empreinte
+        token = re.search(r'/verify-email/(\w+)', mail.outbox[0].body).group(1)
+        self.assertEqual(hash_token(token), user.email_verification_token)
+        self.assertIsNotNone(user.email_verification_sent_at)
+    
+    def test_verify_email(self):
+        """Teste la vérification de l'email à partir du jeton."""
+        user = User.objects.create_user(username='pending', email='pending@example.com',
+                                        password='testpassword123', is_active=False)
+        token = user.generate_email_verification_token()
+        
+        request = self.factory.post('/api/auth/verify-email/', {'token': token}, format='json')
+        response = VerifyEmailView.as_view()(request)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+        self.assertTrue(user.email_verified)
+        self.assertIsNone(user.email_verification_token)
+        
+        # Un jeton déjà consommé est refusé
+        response = VerifyEmailView.as_view()(self.factory.post('/api/auth/verify-email/', {'token': token}, format='json'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_token_custom_claims(self):
+        """Teste les informations utilisateur ajoutées au jeton et à la réponse de connexion."""
+        User.objects.create_user(username='verified', email='verified@example.com', password='testpassword123',
+                                 role='technician', email_verified=True)
+        serializer = CustomTokenObtainPairSerializer(data={'username': 'verified', 'password': 'testpassword123'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        
+        self.assertEqual(serializer.validated_data['role'], 'technician')
+        self.assertTrue(serializer.validated_data['email_verified'])
+        access = AccessToken(serializer.validated_data['access'])
+        self.assertEqual(access['username'], 'verified')
+        self.assertEqual(access['email'], 'verified@example.com')
+    
+    def test_password_reset_confirm(self):
+        """Teste qu'un lien de réinitialisation ne sert qu'une fois."""
+        user = User.objects.create_user(username='resetme', email='resetme@example.com', password='testpassword123')
+        payload = {
+            'uid': encode_uid(user.pk),
+            'token': user.generate_password_reset_token(),
+            'new_password': 'N3wStr0ngPassword!',
+            'confirm_new_password': 'N3wStr0ngPassword!',
+        }
+        
+        # Un SELECT restreint et un UPDATE, sans rechargement de champ différé
+        with self.assertNumQueries(4):  # + SAVEPOINT / RELEASE de la transaction
+            response = PasswordResetConfirmView.as_view()(self.factory.post('/', payload, format='json'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('N3wStr0ngPassword!'))
+        self.assertIsNone(user.password_reset_token)
+        
+        response = PasswordResetConfirmView.as_view()(self.factory.post('/', payload, format='json'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_logout_blacklists_refresh_token(self):
+        """Teste la révocation du jeton de rafraîchissement à la déconnexion."""
+        user = User.objects.create_user(username='leaving', email='leaving@example.com', password='testpassword123')
+        refresh = RefreshToken.for_user(user)
+        
+        request = self.factory.post('/api/auth/logout/', {'refresh': str(refresh)}, format='json')
+        force_authenticate(request, user=user)
+        response = LogoutView.as_view()(request)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=refresh['jti']).exists())
+        with self.assertRaises(TokenError):
+            CustomTokenRefreshSerializer(data={'refresh': str(refresh)}).is_valid()
+    
+    def test_logout_with_delayed_blacklist_task(self):
+        """Teste la déconnexion avec cache partagé lorsque la tâche de révocation est différée."""
+        user = User.objects.create_user(username='delayed', email='delayed@example.com', password='testpassword123')
+        refresh = RefreshToken.for_user(user)
+        
+        request = self.factory.post('/api/auth/logout/', {'refresh': str(refresh)}, format='json')
+        force_authenticate(request, user=user)
+        with mock.patch('authentication.views.cache_is_shared', return_value=True), \
+                mock.patch.object(blacklist_refresh_token_task, 'delay') as delay:
+            response = LogoutView.as_view()(request)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Seuls l'identifiant et l'expiration du jeton transitent par le broker
+        delay.assert_called_once_with(refresh['jti'], refresh['exp'])
+        
+        # Avant l'exécution de la tâche, le marqueur en cache suffit à refuser le jeton
+        self.assertFalse(BlacklistedToken.objects.filter(token__jti=refresh['jti']).exists())
+        with self.assertRaises(TokenError):
+            CustomTokenRefreshSerializer(data={'refresh': str(refresh)}).is_valid()
+        
+        blacklist_refresh_token_task(*delay.call_args.args)
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=refresh['jti']).exists())
+    
+    def test_cached_blacklist_marker(self):
+        """Teste qu'un jeton marqué en cache est refusé avant l'écriture en base."""
+        user = User.objects.create_user(username='marked', email='marked@example.com', password='testpassword123')
+        refresh = RefreshToken.for_user(user)
+        self.assertTrue(CustomTokenRefreshSerializer(data={'refresh': str(refresh)}).is_valid())
+        
+        other = RefreshToken.for_user(user)
+        mark_blacklisted(other)
+        self.assertFalse(BlacklistedToken.objects.filter(token__jti=other['jti']).exists())
+        with self.assertRaises(TokenError):
+            CustomTokenRefreshSerializer(data={'refresh': str(other)}).is_valid()
+    
+    def test_password_reset_throttled_per_email(self):
+        """Teste la limitation du nombre d'emails demandés pour une même adresse."""
+        def request_reset(email):
+            request = self.factory.post('/api/auth/password-reset/', {'email': email}, format='json')
+            return PasswordResetRequestView.as_view()(request)
+        
+        for _ in range(3):
+            self.assertEqual(request_reset('nobody@example.com').status_code, status.HTTP_200_OK)
+        
+        # La casse de l'adresse ne permet pas de contourner la limite
+        self.assertEqual(request_reset('NOBODY@example.com').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(request_reset('someone@example.com').status_code, status.HTTP_200_OK)
+    
+    def test_password_reset_with_non_object_body(self):
+        """Teste qu'un corps JSON qui n'est pas un objet donne une erreur 400."""
+        request = self.factory.post('/api/auth/password-reset/', ['nobody@example.com'], format='json')
+        response = PasswordResetRequestView.as_view()(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_worker_mail_connection_reused(self):
+        """Teste la réutilisation de la connexion email d'un worker Celery."""
+        from authentication import tasks
+        
+        user = User.objects.create_user(username='mailer', email='mailer@example.com', password='testpassword123')
+        tasks._open_mail_connection()
+        sent = []
+        send_messages = tasks._mail_connection.send_messages
+        tasks._mail_connection.send_messages = lambda messages: sent.extend(messages) or send_messages(messages)
+        try:
+            send_password_reset_email_task(user.pk, user.generate_password_reset_token())
+            send_password_reset_email_task(user.pk, user.generate_password_reset_token())
+        finally:
+            tasks._close_mail_connection()
+            tasks._mail_connection = None
+        
+        # Les deux emails passent par la même connexion SMTP
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(len(mail.outbox), 2)
+    
+    def test_uid_encoding(self):
+        """Teste l'encodage compact de l'identifiant utilisateur des liens de réinitialisation."""
+        for pk in (1, 12345, 2 ** 63 - 1):
+            self.assertEqual(decode_uid(encode_uid(pk)), pk)
+        self.assertEqual(len(encode_uid(12345)), 11)
+        for invalid in ('MTIz', '***', 'é'):
+            with self.assertRaises(ValueError):
+                decode_uid(invalid)
+    
+    def test_purge_expired_tokens(self):
+        """Teste la purge des jetons de vérification et de réinitialisation expirés."""
+        expired = User.objects.create_user(username='expired', email='expired@example.com', password='testpassword123')
+        recent = User.objects.create_user(username='recent', email='recent@example.com', password='testpassword123')
+        expired.generate_password_reset_token()
+        recent.generate_password_reset_token()
+        User.objects.filter(pk=expired.pk).update(
+            email_verification_sent_at=timezone.now() - timedelta(hours=49),
+            password_reset_sent_at=timezone.now() - timedelta(hours=25)
+        )
+        
+        self.assertEqual(purge_expired_tokens(), 2)
+        expired.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertIsNone(expired.email_verification_token)
+        self.assertIsNone(expired.password_reset_token)
+        self.assertIsNotNone(recent.email_verification_token)
+        self.assertIsNotNone(recent.password_reset_token)
+    
+    def test_password_reset_email(self):
+        """Teste l'envoi de l'email de réinitialisation du mot de passe."""
+        User.objects.create_user(username='resetuser', email='reset@example.com', password='testpassword123')
+        request = self.factory.post('/api/auth/password-reset/', {'email': 'reset@example.com'}, format='json')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = PasswordResetRequestView.as_view()(request)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 1)
+        # Le lien contient le jeton en clair, la base n'en garde que l'empreinte
+        token = re.search(r'/reset-password/[\w-]+/([\w-]+)', mail.outbox[0].body).group(1)
+        user = User.objects.get(email='reset@example.com')
+        self.assertEqual(hash_token(token), user.password_reset_token)
+        
+        # Une adresse inconnue reçoit la même réponse, sans email envoyé
+        request = self.factory.post('/api/auth/password-reset/', {'email': 'unknown@example.com'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            unknown_response = PasswordResetRequestView.as_view()(request)
+        self.assertEqual(unknown_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(unknown_response.data, response.data)
+        self.assertEqual(len(mail.outbox), 1)
 
 
 class UtilsTests(TestCase):
@@ -210,6 +815,38 @@ class UtilsTests(TestCase):
         self.assertEqual(error_response.data['message'], 'Error')
         self.assertEqual(error_response.data['errors'], {'field': 'Invalid'})
     
+    def test_format_exception(self):
+        """Teste le formatage des exceptions DRF par api.utils."""
+        response = format_exception(DRFValidationError({'name': ['Requis.', 'Trop court.'], 'age': []}), {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], {'name': 'Requis.', 'age': []})
+        
+        response = format_exception(NotFound('Introuvable'), {})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['message'], 'Introuvable')
+    
+    def test_log_method_calls(self):
+        """Teste le décorateur log_method_calls."""
+        class Greeter:
+            @log_method_calls(level=logging.INFO)
+            def greet(self, name):
+                return f"Bonjour {name}"
+        
+        with self.assertLogs('api.utils', level='INFO') as logs:
+            self.assertEqual(Greeter().greet('Alice'), 'Bonjour Alice')
+        self.assertEqual(logs.records[0].getMessage(), 'Appel de Greeter.greet')
+        self.assertEqual(logs.records[1].getMessage(), 'Fin de Greeter.greet')
+    
+    def test_validate_required_fields(self):
+        """Teste la validation des champs requis."""
+        is_valid, errors = validate_required_fields({'name': 'Ferme', 'size': 0}, ['name', 'size'])
+        self.assertTrue(is_valid)
+        self.assertEqual(errors, {})
+        
+        is_valid, errors = validate_required_fields({'name': '', 'size': None}, ['name', 'size', 'location'])
+        self.assertFalse(is_valid)
+        self.assertEqual(list(errors), ['name', 'size', 'location'])
+    
     def test_service_base(self):
         """Teste la classe ServiceBase."""
         # Créer une classe de service de test
@@ -220,6 +857,81 @@ class UtilsTests(TestCase):
         # Tester l'exécution du service
         result = TestService.execute(value=5)
         self.assertEqual(result, 10)
+    
+    def test_custom_exception_handler(self):
+        """Teste le gestionnaire d'exceptions personnalisé."""
+        # Exception connue : corps pré-rendu
+        response = custom_exception_handler(TimeoutError('boom'), {})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn('detail', json.loads(response.content))
+        
+        # Exception inconnue : message de l'exception
+        response = custom_exception_handler(RuntimeError('boom'), {})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data, {'detail': 'boom'})
+    
+    def test_orjson_renderer(self):
+        """Teste le renderer JSON basé sur orjson."""
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+        
+        data = {'message': gettext_lazy('Erreur'), 'value': Decimal('1.5'), 1: 'é'}
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(json.loads(rendered), {'message': 'Erreur', 'value': 1.5, '1': 'é'})
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+        
+        # Comme le JSONRenderer de DRF, les flottants non finis sont refusés en mode strict
+        for value in (float('nan'), float('inf'), [1.0, float('-inf')]):
+            with self.assertRaises(ValueError):
+                ORJSONRenderer().render({'score': value})
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({'score': value})
+        
+        # Hors mode strict, orjson les écrit sous la forme null
+        renderer = ORJSONRenderer()
+        renderer.strict = False
+        self.assertEqual(json.loads(renderer.render({'score': float('nan')})), {'score': None})
+
+
+@override_settings(DATABASES={**settings.DATABASES, 'replica': {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}}})
+class ReplicaRouterTests(SimpleTestCase):
+    """Tests pour le routage des lectures vers le réplica."""
+    
+    def setUp(self):
+        """Configuration initiale pour les tests."""
+        self.router = ReplicaRouter()
+        cache.clear()
+    
+    def test_reads_stay_on_primary_by_default(self):
+        """Teste que les lectures hors use_replica() restent sur la base principale."""
+        self.assertIsNone(self.router.db_for_read(Notification))
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Notification), 'replica')
+    
+    def test_replica_skipped_for_primary_instances_and_transactions(self):
+        """Teste que le réplica est ignoré pour un objet de la base principale ou dans une transaction."""
+        farm = Farm(name='Test Farm')
+        farm._state.db = 'default'
+        with use_replica():
+            self.assertIsNone(self.router.db_for_read(Farm, instance=farm))
+            with mock.patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertIsNone(self.router.db_for_read(Farm))
+    
+    def test_writes_and_migrations(self):
+        """Teste que les écritures et les migrations visent la base principale."""
+        with use_replica():
+            self.assertEqual(self.router.db_for_write(Farm), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'users'))
+        self.assertFalse(self.router.allow_migrate('replica', 'users'))
+    
+    def test_cached_queryset_reads_from_replica(self):
+        """Teste que le corps d'une fonction cached_queryset lit depuis le réplica."""
+        @cached_queryset(timeout=60, key_prefix='replica-test')
+        def read_alias():
+            return Farm.objects.all().db
+        
+        self.assertEqual(read_alias(), 'replica')
+        self.assertEqual(Farm.objects.all().db, 'default')
 
 
 if __name__ == '__main__':
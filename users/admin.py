@@ -20,6 +20,7 @@ class UserAdmin(BaseUserAdmin):
         (_('Informations personnelles'), {'fields': ('email', 'first_name', 'last_name', 'profile_image')}),
         (_('Rôle et organisation'), {'fields': ('role', 'organization', 'address', 'phone_number')}),
         (_('Vérification'), {'fields': ('email_verified', 'email_verification_token', 'email_verification_sent_at')}),
+        (_('Réinitialisation du mot de passe'), {'fields': ('password_reset_token', 'password_reset_sent_at')}),
         (_('Permissions'), {
             'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions'),
         }),
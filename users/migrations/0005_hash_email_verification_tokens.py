@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-16 04:10
+
+import hashlib
+
+from django.db import migrations
+
+
+def hash_existing_tokens(apps, schema_editor):
+    """
+    Remplace les jetons de vérification en clair par leur empreinte SHA-256.
+    Les liens déjà envoyés restent valides.
+    """
+    User = apps.get_model('users', 'User')
+    users = User.objects.exclude(email_verification_token__isnull=True).exclude(email_verification_token='')
+
+    for user in users.only('pk', 'email_verification_token').iterator():
+        user.email_verification_token = hashlib.sha256(user.email_verification_token.encode()).hexdigest()
+        user.save(update_fields=['email_verification_token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_farm_options_alter_user_options_and_more'),
+    ]
+
+    operations = [
+        # Les empreintes ne peuvent pas être inversées : le retour arrière ne fait rien
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-16 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_email_upper_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='password_reset_sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name="date d'envoi de la réinitialisation du mot de passe"),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='password_reset_token',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='jeton de réinitialisation du mot de passe'),
+        ),
+    ]
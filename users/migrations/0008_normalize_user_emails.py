@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def normalize_emails(apps, schema_editor):
+    """
+    Met les emails existants en minuscules, comme le fait désormais User.save().
+
+    Échoue en listant les conflits si des comptes ne diffèrent que par la casse
+    de leur email : ils doivent être fusionnés ou corrigés à la main au préalable.
+    """
+    User = apps.get_model('users', 'User')
+
+    duplicates = list(
+        User.objects.annotate(email_lower=Lower('email'))
+        .values('email_lower')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list('email_lower', flat=True)
+    )
+    if duplicates:
+        conflicts = User.objects.annotate(email_lower=Lower('email')).filter(
+            email_lower__in=duplicates
+        ).order_by('email_lower', 'pk').values_list('pk', 'email')
+        raise RuntimeError(
+            "Des comptes ne diffèrent que par la casse de leur email ; corrigez-les avant de migrer :\n"
+            + "\n".join(f"  - id={pk} email={email}" for pk, email in conflicts)
+        )
+
+    User.objects.exclude(email=Lower('email')).update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_password_reset_token'),
+    ]
+
+    operations = [
+        # La casse d'origine n'est pas conservée : le retour arrière ne fait rien
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+    ]
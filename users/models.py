@@ -1,16 +1,40 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
-from django.utils.crypto import get_random_string
+from django.utils.crypto import get_random_string, constant_time_compare
 from django.conf import settings
 from django.utils import timezone
 import uuid
+import hashlib
+import secrets
+
+
+def hash_token(token):
+    """
+    Calcule l'empreinte SHA-256 d'un jeton : seule l'empreinte est stockée en base.
+    
+    Args:
+        token: Le jeton en clair
+        
+    Returns:
+        str: L'empreinte hexadécimale (64 caractères)
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 class UserManager(BaseUserManager):
     """
     Manager personnalisé pour le modèle User avec support amélioré pour l'email.
     """
+    @classmethod
+    def normalize_email(cls, email):
+        """
+        Normalise l'adresse email entière en minuscules pour que les recherches
+        insensibles à la casse restent cohérentes avec les données stockées.
+        """
+        return super().normalize_email(email).lower()
+    
     def create_user(self, username, email, password=None, **extra_fields):
         """
         Crée et sauvegarde un utilisateur avec l'email et le mot de passe donnés.
@@ -90,6 +114,19 @@ class User(AbstractUser):
         null=True
     )
     
+    # Réinitialisation du mot de passe (seule l'empreinte du jeton est stockée)
+    password_reset_token = models.CharField(
+        _('jeton de réinitialisation du mot de passe'), 
+        max_length=64, 
+        blank=True, 
+        null=True
+    )
+    password_reset_sent_at = models.DateTimeField(
+        _('date d\'envoi de la réinitialisation du mot de passe'), 
+        blank=True, 
+        null=True
+    )
+    
     # Champs supplémentaires pour les agriculteurs
     organization = models.CharField(_('organisation'), max_length=100, blank=True, null=True)
     address = models.TextField(_('adresse'), blank=True, null=True)
@@ -111,6 +148,8 @@ class User(AbstractUser):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['email']),
+            # Recherches email__iexact (UPPER(email) = UPPER(%s))
+            models.Index(Upper('email'), name='user_email_upper_idx'),
             models.Index(fields=['role']),
             models.Index(fields=['email_verified']),
         ]
@@ -122,6 +161,20 @@ class User(AbstractUser):
         super().clean()
         self.email = self.__class__.objects.normalize_email(self.email)
     
+    def save(self, *args, **kwargs):
+        """Normalise l'email avant chaque sauvegarde qui l'inclut."""
+        update_fields = kwargs.get('update_fields')
+        # update_fields est testé d'abord pour ne pas charger un email différé (.only())
+        if (update_fields is None or 'email' in update_fields) and self.email:
+            self.email = self.__class__.objects.normalize_email(self.email)
+        # Le signal check_email_change peut réinitialiser la vérification :
+        # ces champs doivent être écrits avec l'email
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {
+                *update_fields, 'email_verified', 'email_verification_token', 'email_verification_sent_at'
+            }
+        super().save(*args, **kwargs)
+    
     @property
     def is_farmer(self):
         """Vérifie si l'utilisateur est un agriculteur."""
@@ -145,11 +198,17 @@ class User(AbstractUser):
         return self.username
     
     def generate_email_verification_token(self):
-        """Génère un jeton aléatoire pour la vérification de l'email."""
-        self.email_verification_token = get_random_string(64)
+        """
+        Génère un jeton aléatoire pour la vérification de l'email.
+        
+        Seule l'empreinte du jeton est enregistrée : le jeton en clair n'est
+        retourné qu'une fois, pour être inclus dans l'email de vérification.
+        """
+        token = get_random_string(64)
+        self.email_verification_token = hash_token(token)
         self.email_verification_sent_at = timezone.now()
         self.save(update_fields=['email_verification_token', 'email_verification_sent_at'])
-        return self.email_verification_token
+        return token
     
     def verify_email(self):
         """Marque l'email comme vérifié et efface le jeton."""
@@ -157,6 +216,30 @@ class User(AbstractUser):
         self.email_verification_token = None
         self.save(update_fields=['email_verified', 'email_verification_token'])
     
+    def generate_password_reset_token(self):
+        """
+        Génère un jeton aléatoire pour la réinitialisation du mot de passe.
+        
+        Seule l'empreinte du jeton est enregistrée : le jeton en clair n'est
+        retourné qu'une fois, pour être inclus dans l'email de réinitialisation.
+        """
+        token = secrets.token_urlsafe(32)
+        self.password_reset_token = hash_token(token)
+        self.password_reset_sent_at = timezone.now()
+        self.save(update_fields=['password_reset_token', 'password_reset_sent_at'])
+        return token
+    
+    def password_reset_token_is_valid(self, token, max_age_hours=24):
+        """Vérifie un jeton de réinitialisation du mot de passe et sa date d'expiration."""
+        if not self.password_reset_token or not self.password_reset_sent_at:
+            return False
+        
+        if not constant_time_compare(hash_token(token), self.password_reset_token):
+            return False
+        
+        expiration_time = self.password_reset_sent_at + timezone.timedelta(hours=max_age_hours)
+        return timezone.now() <= expiration_time
+    
     def token_is_valid(self, max_age_hours=48):
         """Vérifie si le jeton de vérification d'email est encore valide."""
         if not self.email_verification_token or not self.email_verification_sent_at:
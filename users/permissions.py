@@ -1,4 +1,5 @@
 from rest_framework import permissions
+from django.core.exceptions import FieldDoesNotExist
 from django.utils.translation import gettext_lazy as _
 
 
@@ -9,22 +10,43 @@ class IsOwnerOrAdmin(permissions.BasePermission):
     """
     message = _("Vous devez être le propriétaire de cet objet ou un administrateur.")
 
+    # Attribut de comparaison résolu une seule fois par classe de modèle
+    _owner_attrs = {}
+
+    @staticmethod
+    def _resolve_owner_attr(model_class):
+        """
+        Détermine l'attribut à comparer à l'identifiant de l'utilisateur.
+        
+        Args:
+            model_class: La classe de modèle de l'objet contrôlé
+            
+        Returns:
+            str: Nom de l'attribut (clé étrangère brute ou clé primaire)
+        """
+        for name in ('owner', 'user'):
+            try:
+                field = model_class._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_one or field.one_to_one:
+                # Comparer la clé étrangère brute évite de charger l'objet lié
+                return field.attname
+        
+        # Pour les objets User, vérifier si l'utilisateur est lui-même
+        return 'pk'
+
     def has_object_permission(self, request, view, obj):
         # Les administrateurs ont toujours accès
         if request.user.is_staff or request.user.is_admin_user:
             return True
         
-        # Vérifier si l'objet a un attribut 'owner' ou 'user'
-        if hasattr(obj, 'owner'):
-            return obj.owner == request.user
-        elif hasattr(obj, 'user'):
-            return obj.user == request.user
+        model_class = type(obj)
+        attr = self._owner_attrs.get(model_class)
+        if attr is None:
+            attr = self._owner_attrs[model_class] = self._resolve_owner_attr(model_class)
         
-        # Pour les objets User, vérifier si l'utilisateur est lui-même
-        if hasattr(obj, 'id') and hasattr(request.user, 'id'):
-            return obj.id == request.user.id
-        
-        return False
+        return getattr(obj, attr) == request.user.pk
 
 
 class IsAdminUser(permissions.BasePermission):
@@ -125,7 +125,7 @@ class UserSerializer(serializers.ModelSerializer):
         style={'input_type': 'password'}
     )
     email = serializers.EmailField(
-        validators=[UniqueValidator(queryset=User.objects.all())],
+        validators=[UniqueValidator(queryset=User.objects.all(), lookup='iexact')],
         help_text=_("L'adresse email doit être unique.")
     )
     full_name = serializers.CharField(read_only=True)
@@ -3,7 +3,11 @@ from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .models import Farm, UserSettings
+from .models import Farm, UserSettings, hash_token
+from .permissions import IsOwnerOrAdmin
+from types import SimpleNamespace
+from importlib import import_module
+from django.apps import apps as django_apps
 import uuid
 
 User = get_user_model()
@@ -50,6 +54,52 @@ class UserModelTests(TestCase):
         )
         self.assertTrue(hasattr(user, 'settings'))
         self.assertIsInstance(user.settings, UserSettings)
+        self.assertEqual(user.settings.notification_preferences, user.settings.default_notification_preferences)
+        
+    def test_email_normalized_to_lowercase(self):
+        """Test de la normalisation de l'email en minuscules."""
+        user = User.objects.create_user(
+            username="caseuser",
+            email="Case.User@Example.COM",
+            password="password123"
+        )
+        self.assertEqual(user.email, "case.user@example.com")
+        self.assertEqual(User.objects.get(email__iexact="CASE.user@example.com"), user)
+    
+    def test_email_change_with_update_fields(self):
+        """Test de la réinitialisation de la vérification lors d'une sauvegarde partielle."""
+        user = User.objects.create_user(
+            username="changeuser",
+            email="change@example.com",
+            password="password123"
+        )
+        user.generate_email_verification_token()
+        user.verify_email()
+        
+        user.email = "New.Address@Example.com"
+        user.save(update_fields=['email'])
+        user.refresh_from_db()
+        self.assertEqual(user.email, "new.address@example.com")
+        self.assertFalse(user.email_verified)
+        self.assertIsNone(user.email_verification_token)
+        self.assertIsNone(user.email_verification_sent_at)
+    
+    def test_normalize_existing_emails_migration(self):
+        """Test de la migration mettant en minuscules les emails existants."""
+        normalize_emails = import_module('users.migrations.0008_normalize_user_emails').normalize_emails
+        user = User.objects.create_user(username="legacy", email="legacy@example.com", password="password123")
+        # Email enregistré avant la normalisation (contourne save())
+        User.objects.filter(pk=user.pk).update(email="Legacy@Example.com")
+        
+        normalize_emails(django_apps, None)
+        user.refresh_from_db()
+        self.assertEqual(user.email, "legacy@example.com")
+        
+        # Des comptes ne différant que par la casse bloquent la migration
+        other = User.objects.create_user(username="legacy2", email="other@example.com", password="password123")
+        User.objects.filter(pk=other.pk).update(email="LEGACY@example.com")
+        with self.assertRaisesMessage(RuntimeError, "email=LEGACY@example.com"):
+            normalize_emails(django_apps, None)
         
     def test_email_verification_token(self):
         """Test de génération du token de vérification d'email."""
@@ -60,7 +110,9 @@ class UserModelTests(TestCase):
         )
         token = user.generate_email_verification_token()
         self.assertIsNotNone(token)
-        self.assertEqual(token, user.email_verification_token)
+        # Seule l'empreinte du jeton est stockée
+        self.assertNotEqual(token, user.email_verification_token)
+        self.assertEqual(hash_token(token), user.email_verification_token)
         self.assertIsNotNone(user.email_verification_sent_at)
 
 
@@ -122,6 +174,42 @@ class FarmModelTests(TestCase):
         self.assertFalse(farm2.has_location_data)
 
 
+class PermissionTests(TestCase):
+    """Tests pour les permissions personnalisées."""
+    
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username="owner",
+            email="owner@example.com",
+            password="testpassword123"
+        )
+        self.other = User.objects.create_user(
+            username="other",
+            email="other@example.com",
+            password="testpassword123"
+        )
+        self.farm = Farm.objects.create(name="Owner Farm", location="Somewhere", owner=self.owner)
+        self.permission = IsOwnerOrAdmin()
+    
+    def check(self, user, obj):
+        request = SimpleNamespace(user=user)
+        return self.permission.has_object_permission(request, None, obj)
+    
+    def test_is_owner_or_admin(self):
+        """Test de IsOwnerOrAdmin sur les objets avec propriétaire, utilisateur ou eux-mêmes."""
+        # Objet avec propriétaire
+        self.assertTrue(self.check(self.owner, self.farm))
+        self.assertFalse(self.check(self.other, self.farm))
+        
+        # Objet lié à un utilisateur
+        self.assertTrue(self.check(self.owner, self.owner.settings))
+        self.assertFalse(self.check(self.other, self.owner.settings))
+        
+        # L'utilisateur lui-même
+        self.assertTrue(self.check(self.other, self.other))
+        self.assertFalse(self.check(self.other, self.owner))
+
+
 class UserAPITests(APITestCase):
     """Tests pour l'API des utilisateurs."""
     
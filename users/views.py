@@ -9,9 +9,11 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Avg, Q
+from django.db.models import Count, Q, Sum
 from django.utils.translation import gettext_lazy as _
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from math import cos, radians
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 
 from .models import Farm, UserSettings
@@ -26,11 +28,14 @@ from .permissions import (
     IsAdminUser, 
     IsAuthenticatedAndVerified
 )
+from plum_classifier.models import CLASS_LABELS
+from plum_classifier.serializers import PlumBatchSerializer
+from api.optimizations import AutoPrefetchMixin
 
 User = get_user_model()
 
 
-class UserList(ListCreateAPIView):
+class UserList(AutoPrefetchMixin, ListCreateAPIView):
     """
     Vue pour lister tous les utilisateurs ou créer un nouvel utilisateur.
     """
@@ -48,7 +53,7 @@ class UserList(ListCreateAPIView):
         Les administrateurs peuvent voir tous les utilisateurs.
         """
         user = self.request.user
-        queryset = User.objects.all()
+        queryset = super().get_queryset()
         
         # Filtrage par rôle si spécifié dans les paramètres de requête
         role = self.request.query_params.get('role', None)
@@ -76,7 +81,7 @@ class UserList(ListCreateAPIView):
         serializer.save(last_login_ip=ip)
 
 
-class UserDetail(RetrieveUpdateDestroyAPIView):
+class UserDetail(AutoPrefetchMixin, RetrieveUpdateDestroyAPIView):
     """
     Vue pour récupérer, mettre à jour ou supprimer un utilisateur spécifique.
     """
@@ -209,11 +214,7 @@ def user_stats(request):
     # Statistiques supplémentaires
     active_users = User.objects.filter(is_active=True).count()
     
-    try:
-        from django.utils import timezone
-        recent_users = User.objects.filter(created_at__gte=timezone.now() - timezone.timedelta(days=30)).count()
-    except:
-        recent_users = 0  # Fallback si timezone n'est pas importé correctement
+    recent_users = User.objects.filter(created_at__gte=timezone.now() - timezone.timedelta(days=30)).count()
     
     return Response({
         'total_users': total_users,
@@ -225,7 +226,7 @@ def user_stats(request):
     })
 
 
-class FarmList(ListCreateAPIView):
+class FarmList(AutoPrefetchMixin, ListCreateAPIView):
     """
     Vue pour lister toutes les fermes ou créer une nouvelle ferme.
     """
@@ -243,7 +244,7 @@ class FarmList(ListCreateAPIView):
         Les administrateurs peuvent voir toutes les fermes.
         """
         user = self.request.user
-        queryset = Farm.objects.all()
+        queryset = super().get_queryset()
         
         # Filtrage par taille si spécifié
         min_size = self.request.query_params.get('min_size', None)
@@ -279,7 +280,7 @@ class FarmList(ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class FarmDetail(RetrieveUpdateDestroyAPIView):
+class FarmDetail(AutoPrefetchMixin, RetrieveUpdateDestroyAPIView):
     """
     Vue pour récupérer, mettre à jour ou supprimer une ferme spécifique.
     """
@@ -313,11 +314,18 @@ def farm_stats(request, pk):
     if not (request.user.is_staff or request.user.is_admin_user or farm.owner == request.user):
         raise PermissionDenied(_("Vous n'avez pas la permission d'accéder à ces statistiques."))
     
-    # Obtenir toutes les classifications pour cette ferme
-    classifications = farm.classifications.all()
+    # Compter les classifications de la ferme par classe en une seule requête
+    rows = farm.classifications.order_by('class_name').values('class_name').annotate(
+        count=Count('id'),
+        confidence_sum=Sum('confidence_score')
+    )
     
-    # Statistiques de base
-    total_classifications = classifications.count()
+    class_counts = {}
+    total_classifications = confidence_sum = 0
+    for row in rows:
+        class_counts[str(CLASS_LABELS.get(row['class_name'], row['class_name']))] = row['count']
+        total_classifications += row['count']
+        confidence_sum += row['confidence_sum']
     
     if total_classifications == 0:
         return Response({
@@ -327,12 +335,6 @@ def farm_stats(request, pk):
             'message': 'Aucune classification disponible pour cette ferme'
         })
     
-    # Distribution des classes
-    class_counts = {}
-    for classification in classifications:
-        class_name = classification.get_class_name_display()
-        class_counts[class_name] = class_counts.get(class_name, 0) + 1
-    
     # Pourcentages
     class_percentages = {}
     for class_name, count in class_counts.items():
@@ -340,23 +342,21 @@ def farm_stats(request, pk):
         class_percentages[class_name] = round(percentage, 2)
     
     # Confiance moyenne
-    avg_confidence = classifications.aggregate(Avg('confidence_score'))['confidence_score__avg']
+    avg_confidence = confidence_sum / total_classifications
     
-    # Statistiques par lot
-    batches = farm.batches.all()
-    batch_stats = []
-    
-    for batch in batches:
-        batch_classifications = batch.classifications.all()
-        batch_count = batch_classifications.count()
-        
-        if batch_count > 0:
-            batch_stats.append({
-                'batch_id': str(batch.id),
-                'batch_name': batch.name,
-                'total_classifications': batch_count,
-                'quality_distribution': batch.quality_distribution
-            })
+    # Statistiques par lot (effectifs annotés en une seule requête)
+    batches = farm.batches.annotate(classification_count=Count('classifications')).filter(
+        classification_count__gt=0
+    ).only('id', 'name', 'quality_distribution')
+    batch_stats = [
+        {
+            'batch_id': str(batch.id),
+            'batch_name': batch.name,
+            'total_classifications': batch.classification_count,
+            'quality_distribution': batch.quality_distribution
+        }
+        for batch in batches
+    ]
     
     return Response({
         'farm_id': str(farm.id),
@@ -387,7 +387,6 @@ def farm_batches(request, pk):
     
     batches = farm.batches.all()
     
-    from plum_classifier.serializers import PlumBatchSerializer
     serializer = PlumBatchSerializer(batches, many=True)
     
     return Response(serializer.data)
@@ -428,7 +427,6 @@ def farms_nearby(request):
     # Calculer les fermes à proximité
     # Note: Cette méthode est approximative et fonctionne bien pour de petites distances
     # Pour une solution plus précise, utiliser PostGIS ou une bibliothèque géospatiale
-    from math import cos, radians
     
     # Conversion du rayon en degrés (approximation)
     lat_radius = radius / 111.0  # 1 degré de latitude ≈ 111 km